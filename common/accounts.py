@@ -0,0 +1,109 @@
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+from snowflake.snowpark import Session
+from snowflake.snowpark.context import get_active_session
+
+from common.execution import context_pool
+
+ACCOUNTS = [name.strip() for name in os.environ.get("USAGE_INSIGHTS_ACCOUNTS", "").split(",") if name.strip()]
+MAX_WORKERS = 12
+
+
+class AccountSession:
+    """A Snowpark session tagged with the account it is connected to.
+
+    Everything but `account` is delegated to the wrapped session. Cached
+    datasets include the account in their key, so one dataset function can
+    be fanned out across accounts without the results colliding.
+    """
+
+    def __init__(self, account, session):
+        self.account = account
+        self.session = session
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+class SessionPool:
+    """One lazily created, process-wide session per configured account.
+
+    Accounts are connection names from connections.toml. With no accounts
+    configured the pool holds just the active session, named after its
+    account. `connect` replaces how a named account's session is created,
+    for example with stand-in sessions in tests.
+    """
+
+    def __init__(self, accounts=None, connect=None):
+        self.accounts = list(accounts) if accounts is not None else ACCOUNTS
+        self.connect = connect
+        self._sessions = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        if self.accounts:
+            return list(self.accounts)
+        with self._lock:
+            if not self._sessions:
+                active = get_active_session()
+                name = active.get_current_account().strip('"')
+                self._sessions[name] = AccountSession(name, active)
+            return list(self._sessions)
+
+    def get(self, name):
+        with self._lock:
+            if name in self._sessions:
+                return self._sessions[name]
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._sessions:
+                session = AccountSession(name, self._connect(name))
+                with self._lock:
+                    self._sessions[name] = session
+            return self._sessions[name]
+
+    def _connect(self, name):
+        if name not in self.accounts:
+            raise KeyError(f"Account {name!r} is not configured in USAGE_INSIGHTS_ACCOUNTS")
+        if self.connect is not None:
+            return self.connect(name)
+        return Session.builder.config("connection_name", name).create()
+
+
+POOL = SessionPool()
+
+
+def fan_out(fn, accounts, *args):
+    """Run a dataset function against every account concurrently.
+
+    `fn` is called as fn(session, *args) once per account and the results
+    are stacked with a leading ACCOUNT_NAME column.
+    """
+    sessions = [POOL.get(name) for name in accounts]
+    if len(sessions) == 1:
+        frames = [fn(sessions[0], *args)]
+    else:
+        with context_pool(min(MAX_WORKERS, max(len(sessions), 1))) as pool:
+            frames = list(pool.map(lambda session: fn(session, *args), sessions))
+    for session, frame in zip(sessions, frames):
+        frame.insert(0, 'ACCOUNT_NAME', session.account)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def account_filter():
+    """Sidebar multiselect of accounts; returns every account if none are picked."""
+    names = POOL.names()
+    if len(names) == 1:
+        return names
+    return st.sidebar.multiselect("Accounts", names, default=names, key="accounts") or names
+
+
+def account_session():
+    """Sidebar picker for single-account pages; returns that account's session."""
+    names = POOL.names()
+    name = names[0] if len(names) == 1 else st.sidebar.selectbox("Account", names, key="account")
+    return POOL.get(name)
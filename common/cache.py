@@ -0,0 +1,247 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_BUDGET_BYTES = int(os.environ.get("USAGE_INSIGHTS_CACHE_MB", "512")) * 1024 * 1024
+CACHE_POLICY = os.environ.get("USAGE_INSIGHTS_CACHE_POLICY", "lru")
+
+MISSING = object()
+_local = threading.local()
+
+
+def value_nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("dataset", "value", "nbytes", "expires_at", "hits", "created_at", "last_access")
+
+    def __init__(self, dataset, value, nbytes, ttl):
+        now = time.time()
+        self.dataset = dataset
+        self.value = value
+        self.nbytes = nbytes
+        self.expires_at = now + ttl if ttl else None
+        self.hits = 0
+        self.created_at = now
+        self.last_access = now
+
+
+class _Flight(Future):
+    """A result being computed by one caller that others can wait on."""
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+
+
+class DatasetCache:
+    """Process-wide result cache bounded by the byte size of what it holds.
+
+    Entries are evicted least-recently-used (or least-frequently-used) first
+    until the resident bytes fit the budget. Concurrent misses on the same
+    key are coalesced: the first caller computes, the rest wait for its
+    result. Every dataset keeps hit, miss, eviction and coalescing counters
+    for the admin page.
+    """
+
+    def __init__(self, budget_bytes=CACHE_BUDGET_BYTES, policy=CACHE_POLICY):
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.resident_bytes = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def _counters(self, dataset):
+        return self._stats.setdefault(dataset, {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0, "rejected": 0})
+
+    def get(self, dataset, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                self._counters(dataset)["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counters(dataset)["misses"] += 1
+                return MISSING
+            entry.hits += 1
+            entry.last_access = time.time()
+            self._entries.move_to_end(key)
+            self._counters(dataset)["hits"] += 1
+            return entry.value
+
+    def put(self, dataset, key, value, ttl=None, max_entries=None):
+        nbytes = value_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.budget_bytes:
+                self._counters(dataset)["rejected"] += 1
+                return
+            if max_entries:
+                own = [k for k, e in self._entries.items() if e.dataset == dataset]
+                while len(own) >= max_entries:
+                    self._evict(self._victim(own))
+                    own = [k for k, e in self._entries.items() if e.dataset == dataset]
+            while self._entries and self.resident_bytes + nbytes > self.budget_bytes:
+                self._evict(self._victim(self._entries))
+            self._entries[key] = _Entry(dataset, value, nbytes, ttl)
+            self.resident_bytes += nbytes
+
+    def get_or_compute(self, dataset, key, compute, ttl=None, max_entries=None, store=True):
+        """Return the cached value for `key`, computing it at most once at a time.
+
+        With store=False the result is only handed to callers waiting on the
+        same key, not kept, for computations that cache their own parts.
+        """
+        while True:
+            with self._lock:
+                value = self.get(dataset, key) if store else MISSING
+                if value is not MISSING:
+                    return value
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _Flight()
+                else:
+                    flight.waiters += 1
+                    self._counters(dataset)["coalesced"] += 1
+            if leader:
+                break
+            try:
+                return flight.result()
+            except Exception:
+                raise
+            except BaseException:
+                # The leading script run was stopped rather than failing;
+                # retry, becoming the leader if nobody else has.
+                continue
+        _local.flight = flight
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            flight.set_exception(e)
+            raise
+        finally:
+            _local.flight = None
+        if store:
+            self.put(dataset, key, value, ttl, max_entries)
+        with self._lock:
+            del self._inflight[key]
+        flight.set_result(value)
+        return value
+
+    def _victim(self, keys):
+        if self.policy == "lfu":
+            return min(keys, key=lambda k: (self._entries[k].hits, self._entries[k].last_access))
+        return next(iter(k for k in self._entries if k in keys))
+
+    def _evict(self, key):
+        self._counters(self._entries[key].dataset)["evictions"] += 1
+        self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.resident_bytes -= entry.nbytes
+
+    def clear(self, dataset=None):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if dataset is None or e.dataset == dataset]:
+                self._remove(key)
+
+    def coalesced(self):
+        with self._lock:
+            return sum(counters["coalesced"] for counters in self._stats.values())
+
+    def stats(self):
+        with self._lock:
+            rows = []
+            for dataset, counters in sorted(self._stats.items()):
+                resident = [e for e in self._entries.values() if e.dataset == dataset]
+                lookups = counters["hits"] + counters["misses"]
+                rows.append({
+                    "DATASET": dataset,
+                    **{name.upper(): count for name, count in counters.items()},
+                    "HIT_RATE": (counters["hits"] + counters["coalesced"]) / lookups if lookups else 0.0,
+                    "ENTRIES": len(resident),
+                    "RESIDENT_MB": sum(e.nbytes for e in resident) / 1024 / 1024,
+                })
+            return pd.DataFrame(rows)
+
+    def entries(self):
+        now = time.time()
+        with self._lock:
+            return pd.DataFrame([{
+                "DATASET": e.dataset,
+                "KEY": ", ".join(f"{name}={value}" for name, value in key[1]),
+                "SIZE_MB": e.nbytes / 1024 / 1024,
+                "HITS": e.hits,
+                "AGE_SECS": round(now - e.created_at),
+                "IDLE_SECS": round(now - e.last_access),
+            } for key, e in reversed(self._entries.items())])
+
+
+CACHE = DatasetCache()
+
+
+def current_flight():
+    """The in-flight computation this thread is running as leader, if any."""
+    return getattr(_local, "flight", None)
+
+
+def dataset_name(fn):
+    """Cache name of a dataset function: its module file stem and name."""
+    return f"{Path(fn.__code__.co_filename).stem}.{fn.__name__}"
+
+
+def scope_of(session):
+    """Key prefix for results fetched through `session`.
+
+    Sessions that carry an `account` attribute get their results keyed by
+    account, so the same dataset can be cached once per account.
+    """
+    account = getattr(session, "account", None)
+    return (("account", repr(account)),) if account is not None else ()
+
+
+def dataset(ttl=3600, max_entries=None):
+    """Cache a dataset function in the shared, memory-bounded cache.
+
+    Like st.cache_data, arguments whose name starts with an underscore are
+    left out of the cache key, and callers get their own copy of the result.
+    The account of `_session`, if it has one, is part of the key.
+    """
+    def decorator(fn):
+        name = dataset_name(fn)
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name, scope_of(bound.arguments.get("_session")) + tuple((arg, repr(value)) for arg, value in bound.arguments.items() if not arg.startswith("_")))
+            value = CACHE.get_or_compute(name, key, lambda: fn(*args, **kwargs), ttl, max_entries)
+            return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+        wrapper.clear = functools.partial(CACHE.clear, name)
+        wrapper.dataset_name = name
+        return wrapper
+
+    return decorator
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from common.cache import current_flight
+
+STATEMENT_TIMEOUT_SECS = int(os.environ.get("USAGE_INSIGHTS_STATEMENT_TIMEOUT_SECS", "600"))
+POLL_INTERVAL_SECS = 0.2
+
+RUN_STATE_KEY = "_query_run"
+
+# Runs are owned by their session's state and only looked up here, so a
+# session that ends takes its run, and the context it holds, with it.
+_runs = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+
+class QuerySuperseded(BaseException):
+    """Raised in a script run whose queries were cancelled by a newer rerun.
+
+    Like Streamlit's own stop signal it derives from BaseException, so
+    sessions waiting on a shared result retry instead of failing.
+    """
+
+
+class _Run:
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.jobs = []
+        self.cancelled = set()
+        self.cancelled_total = 0
+
+
+def _track(ctx):
+    run = _Run(ctx)
+    ctx.session_state[RUN_STATE_KEY] = run
+    _runs[ctx.session_id] = run
+    return run
+
+
+def _current_run():
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None, None
+    with _lock:
+        return ctx, _runs.get(ctx.session_id)
+
+
+def begin_run():
+    """Start tracking this script run and cancel what the previous one left running.
+
+    Call at the top of every page. A query is left alone if other sessions
+    are waiting on its result.
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    with _lock:
+        previous = _runs.get(ctx.session_id)
+        run = _track(ctx)
+    if previous is None:
+        return
+    run.cancelled_total = previous.cancelled_total
+    for job, flight in previous.jobs:
+        if job.is_done() or (flight is not None and flight.waiters > 0):
+            continue
+        previous.cancelled.add(job.query_id)
+        job.cancel()
+        run.cancelled_total += 1
+
+
+def begin_fragment():
+    """Rebind this session's run to a fragment rerun's context.
+
+    Each st.fragment rerun gets a script run context of its own but belongs
+    to the page's current run, so unlike begin_run nothing is cancelled.
+    Call at the top of every fragment that runs queries.
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    with _lock:
+        run = _runs.get(ctx.session_id)
+        if run is None:
+            _track(ctx)
+        else:
+            run.ctx = ctx
+
+
+def context_pool(max_workers):
+    """Thread pool whose workers run under the current script run context,
+    so the queries they start are tracked and cancelled with the page."""
+    ctx = get_script_run_ctx()
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    )
+
+
+def cancelled_count():
+    _, run = _current_run()
+    return run.cancelled_total if run else 0
+
+
+def run_query(session, query, timeout=None):
+    """Run a query asynchronously so a newer rerun or the timeout can cancel it."""
+    timeout = timeout or STATEMENT_TIMEOUT_SECS
+    ctx, run = _current_run()
+    if run is not None and run.ctx is not ctx:
+        raise QuerySuperseded()
+    job = session.sql(query).to_pandas(block=False, statement_params={"STATEMENT_TIMEOUT_IN_SECONDS": str(timeout)})
+    entry = (job, current_flight())
+    if run is not None:
+        with _lock:
+            run.jobs.append(entry)
+    try:
+        deadline = time.monotonic() + timeout
+        while not job.is_done():
+            if time.monotonic() > deadline:
+                job.cancel()
+                raise TimeoutError(f"Query {job.query_id} exceeded the {timeout}s statement timeout")
+            time.sleep(POLL_INTERVAL_SECS)
+        return job.result()
+    except Exception:
+        if run is not None and job.query_id in run.cancelled:
+            raise QuerySuperseded()
+        raise
+    finally:
+        if run is not None:
+            with _lock:
+                run.jobs.remove(entry)
@@ -0,0 +1,145 @@
+import gzip
+import io
+import os
+import tempfile
+
+DOWNLOAD_MAX_MB = int(os.environ.get("USAGE_INSIGHTS_DOWNLOAD_MAX_MB", "200"))
+
+EXPORT_SOURCES = {
+    "Query History": {
+        "view": "SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY",
+        "time_column": "START_TIME",
+        "filters": {"warehouse": "WAREHOUSE_NAME", "user": "USER_NAME", "status": "EXECUTION_STATUS"},
+    },
+    "Warehouse Metering": {
+        "view": "SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY",
+        "time_column": "START_TIME",
+        "filters": {"warehouse": "WAREHOUSE_NAME"},
+    },
+}
+
+FORMATS = {
+    "CSV (gzip)": {"extension": "csv.gz", "mime": "application/gzip"},
+    "Parquet": {"extension": "parquet", "mime": "application/octet-stream"},
+}
+
+
+class ExportTooLarge(Exception):
+    """Raised when an export outgrows the size it is allowed to reach."""
+
+
+def _in_list(column, values):
+    quoted = ", ".join("'{}'".format(str(v).replace("'", "''")) for v in values)
+    return f"{column} IN ({quoted})"
+
+
+def build_export_query(source, start, end, warehouses=(), users=(), statuses=()):
+    spec = EXPORT_SOURCES[source]
+    conditions = [f"{spec['time_column']} >= '{start}'", f"{spec['time_column']} < '{end}'"]
+    for key, values in (("warehouse", warehouses), ("user", users), ("status", statuses)):
+        if values and key in spec["filters"]:
+            conditions.append(_in_list(spec["filters"][key], values))
+    where = "\n        AND ".join(conditions)
+    return f"""
+    SELECT *
+    FROM {spec['view']}
+    WHERE {where}
+    ORDER BY {spec['time_column']}
+    """
+
+
+def count_rows(session, query):
+    return session.sql(f"SELECT COUNT(*) AS N FROM ({query})").collect()[0]["N"]
+
+
+def _write_csv(batches, out, on_batch):
+    with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        header = True
+        for batch in batches:
+            batch.to_csv(text, index=False, header=header)
+            header = False
+            on_batch(len(batch))
+        text.flush()
+        text.detach()
+
+
+def _arrow_type(datatype):
+    import pyarrow as pa
+    from snowflake.snowpark import types as T
+    if isinstance(datatype, T.DecimalType):
+        return pa.int64() if datatype.scale == 0 else pa.float64()
+    if isinstance(datatype, (T.LongType, T.IntegerType, T.ShortType, T.ByteType)):
+        return pa.int64()
+    if isinstance(datatype, (T.DoubleType, T.FloatType)):
+        return pa.float64()
+    if isinstance(datatype, T.BooleanType):
+        return pa.bool_()
+    if isinstance(datatype, T.DateType):
+        return pa.date32()
+    if isinstance(datatype, T.TimestampType):
+        zoned = datatype.tz in (T.TimestampTimeZone.LTZ, T.TimestampTimeZone.TZ)
+        return pa.timestamp("ns", tz="UTC" if zoned else None)
+    if isinstance(datatype, T.TimeType):
+        return pa.time64("us")
+    if isinstance(datatype, T.BinaryType):
+        return pa.binary()
+    return pa.string()
+
+
+def _write_parquet(batches, out, on_batch, schema):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export requires pyarrow") from e
+    types = [_arrow_type(field.datatype) for field in schema.fields]
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                # Types come from the result metadata, not the first batch,
+                # where an all-NULL or all-integer column would pin the
+                # wrong type for the rest of the file.
+                arrow_schema = pa.schema([pa.field(str(name), t) for name, t in zip(batch.columns, types)])
+                writer = pq.ParquetWriter(out, arrow_schema, compression="zstd")
+            writer.write_table(pa.Table.from_pandas(batch, schema=writer.schema, preserve_index=False))
+            on_batch(len(batch))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def stream_export(session, query, fmt, on_batch=lambda rows: None, max_bytes=None):
+    """Encode the query result batch by batch into a spooled temp file.
+
+    Only one result batch is held in memory at a time; the encoded output
+    spills to disk once it outgrows the in-memory spool. With `max_bytes`
+    the export stops with ExportTooLarge as soon as the output passes it.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+
+    def progress(rows):
+        on_batch(rows)
+        if max_bytes and out.tell() > max_bytes:
+            raise ExportTooLarge(f"Export exceeded {max_bytes / 1024 / 1024:,.0f} MB")
+
+    result = session.sql(query)
+    batches = result.to_pandas_batches()
+    try:
+        if fmt == "Parquet":
+            _write_parquet(batches, out, progress, result.schema)
+        else:
+            _write_csv(batches, out, progress)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def upload_to_stage(session, out, stage_path):
+    out.seek(0)
+    session.file.put_stream(out, stage_path, auto_compress=False, overwrite=True)
+    out.seek(0)
+    return stage_path
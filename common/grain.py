@@ -0,0 +1,47 @@
+import json
+import os
+
+from common.execution import run_query
+
+GRAINS = ["HOUR", "DAY", "WEEK"]
+GRAIN_HOURS = {"HOUR": 1, "DAY": 24, "WEEK": 168}
+GRAIN_LABELS = {"HOUR": "Hour", "DAY": "Day", "WEEK": "Week"}
+
+ROW_BUDGET = int(os.environ.get("USAGE_INSIGHTS_ROW_BUDGET", "5000"))
+SCAN_BUDGET_BYTES = int(os.environ.get("USAGE_INSIGHTS_SCAN_BUDGET_GB", "50")) * 1024 ** 3
+
+
+def choose_grain(start, end, series=1, row_budget=ROW_BUDGET):
+    """Finest grain whose point count over the window fits the row budget."""
+    hours = (end - start).days * 24
+    for grain in GRAINS:
+        if hours / GRAIN_HOURS[grain] * series <= row_budget:
+            return grain
+    return GRAINS[-1]
+
+
+def estimate_scan(session, query):
+    """Compile-only estimate of what `query` would scan, from EXPLAIN."""
+    plan = run_query(session, f"EXPLAIN USING JSON {query}").iloc[0, 0]
+    stats = json.loads(plan).get("GlobalStats", {})
+    return {
+        "partitions_total": stats.get("partitionsTotal", 0),
+        "partitions_assigned": stats.get("partitionsAssigned", 0),
+        "bytes_assigned": stats.get("bytesAssigned", 0),
+    }
+
+
+def plan_grain(session, probe_query, start, end, series=1, row_budget=ROW_BUDGET, scan_budget=SCAN_BUDGET_BYTES):
+    """Pick a grain for the window and check the probe's scan against the budget.
+
+    The scan is fixed by the window, not the grain, so an over-budget probe
+    must not be run at any grain. Callers skip it and serve what they can
+    from the registry's cached daily partials, at the coarsest grain, which
+    is returned here. Returns the grain and the estimate.
+    """
+    grain = choose_grain(start, end, series, row_budget)
+    estimate = estimate_scan(session, probe_query)
+    estimate["over_budget"] = estimate["bytes_assigned"] > scan_budget
+    if estimate["over_budget"]:
+        grain = GRAINS[-1]
+    return grain, estimate
@@ -0,0 +1,90 @@
+import functools
+
+import pandas as pd
+
+from common.cache import CACHE, MISSING, dataset_name, scope_of
+from common.live import account_usage_cutoff, to_epoch
+
+SETTLED_TTL_SECS = 7 * 24 * 3600
+
+
+def utc_day(column):
+    """SQL for the UTC calendar day of a TIMESTAMP_LTZ column."""
+    return f"CONVERT_TIMEZONE('UTC', {column})::DATE"
+
+
+def utc_window(column, start, end):
+    """SQL condition keeping `column` between the UTC midnights of `start` and `end`."""
+    return f"{column} >= TO_TIMESTAMP_LTZ({to_epoch(pd.Timestamp(start))}) AND {column} < TO_TIMESTAMP_LTZ({to_epoch(pd.Timestamp(end))})"
+
+
+def _day_runs(days):
+    """Group sorted days into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == pd.Timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def daily_dataset(ttl=3600, settled_ttl=SETTLED_TTL_SECS):
+    """Cache a per-day aggregate one day at a time.
+
+    The wrapped function is called as fn(_session, start, end, *args) and must
+    return one or more rows per day keyed by a USAGE_DATE column. Days are
+    UTC days, like the ACCOUNT_USAGE cutoff they are settled against, so
+    timestamp columns should be bucketed and bounded with utc_day and
+    utc_window rather than in the session's time zone. Each day is
+    cached separately, so moving a window forward only queries the days that
+    are not resident yet, with consecutive missing days fetched in a single
+    query. Concurrent callers missing the same run of days share one fetch.
+    Days that ACCOUNT_USAGE has fully settled are kept for `settled_ttl`;
+    the most recent days expire after `ttl`.
+    """
+    def decorator(fn):
+        name = dataset_name(fn)
+
+        @functools.wraps(fn)
+        def wrapper(_session, start, end, *args):
+            days = pd.date_range(pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(days=1), freq='D')
+            cutoff = account_usage_cutoff()
+            frames = []
+            missing = []
+            scope = scope_of(_session)
+
+            def key(day):
+                return (name, scope + (("day", day.date().isoformat()), ("args", repr(args))))
+
+            def split(fetched, first, last):
+                fetched_days = pd.to_datetime(fetched['USAGE_DATE']).dt.normalize() if not fetched.empty else pd.Series(dtype='datetime64[ns]')
+                return [(day, fetched[fetched_days == day].reset_index(drop=True)) for day in pd.date_range(first, last, freq='D')]
+
+            def fetch(first, last):
+                fetched = fn(_session, first.date(), (last + pd.Timedelta(days=1)).date(), *args)
+                for day, part in split(fetched, first, last):
+                    settled = day + pd.Timedelta(days=1) <= cutoff
+                    CACHE.put(name, key(day), part, settled_ttl if settled else ttl)
+                return fetched
+
+            for day in days:
+                value = CACHE.get(name, key(day))
+                if value is MISSING:
+                    missing.append(day)
+                else:
+                    frames.append(value)
+            for first, last in _day_runs(missing):
+                run = (name, scope + (("days", f"{first.date()}..{last.date()}"), ("args", repr(args))))
+                fetched = CACHE.get_or_compute(name, run, functools.partial(fetch, first, last), store=False)
+                frames += [part for _, part in split(fetched, first, last)]
+            filled = [f for f in frames if not f.empty]
+            if not filled:
+                return frames[0].copy() if frames else pd.DataFrame()
+            return pd.concat(filled, ignore_index=True).sort_values('USAGE_DATE', ignore_index=True)
+
+        wrapper.clear = functools.partial(CACHE.clear, name)
+        wrapper.dataset_name = name
+        return wrapper
+
+    return decorator
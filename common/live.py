@@ -0,0 +1,138 @@
+import time
+
+import pandas as pd
+
+from common.execution import run_query
+
+ACCOUNT_USAGE_LAG_HOURS = 3
+POLL_OVERLAP_SECS = 60
+QUERY_RESULT_LIMIT = 10000
+
+
+def account_usage_cutoff(now=None):
+    """Start of the hour from which ACCOUNT_USAGE may still be incomplete."""
+    now = now or pd.Timestamp.now(tz='UTC').tz_localize(None)
+    return (now - pd.Timedelta(hours=ACCOUNT_USAGE_LAG_HOURS)).floor('h')
+
+
+def to_epoch(ts):
+    return int((ts - pd.Timestamp(0)).total_seconds())
+
+
+def fetch_query_tail(session, since):
+    query = f"""
+    SELECT 
+        QUERY_ID,
+        CONVERT_TIMEZONE('UTC', START_TIME)::TIMESTAMP_NTZ as START_TIME,
+        CONVERT_TIMEZONE('UTC', END_TIME)::TIMESTAMP_NTZ as END_TIME,
+        USER_NAME,
+        WAREHOUSE_NAME,
+        QUERY_TYPE,
+        EXECUTION_STATUS,
+        ROUND(TOTAL_ELAPSED_TIME / 1000, 1) as DURATION_SECS,
+        LEFT(QUERY_TEXT, 100) as QUERY_PREVIEW
+    FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(
+        END_TIME_RANGE_START => TO_TIMESTAMP_LTZ({to_epoch(since)}),
+        RESULT_LIMIT => {QUERY_RESULT_LIMIT}
+    ))
+    """
+    return run_query(session, query)
+
+
+def fetch_metering_tail(session, since):
+    query = f"""
+    SELECT 
+        WAREHOUSE_NAME,
+        CONVERT_TIMEZONE('UTC', START_TIME)::TIMESTAMP_NTZ as START_TIME,
+        CREDITS_USED as CREDITS
+    FROM TABLE(INFORMATION_SCHEMA.WAREHOUSE_METERING_HISTORY(
+        DATE_RANGE_START => TO_TIMESTAMP_LTZ({to_epoch(since.floor('h'))})
+    ))
+    """
+    return run_query(session, query)
+
+
+def fetch_load_tail(session, since):
+    query = f"""
+    SELECT 
+        WAREHOUSE_NAME,
+        CONVERT_TIMEZONE('UTC', START_TIME)::TIMESTAMP_NTZ as START_TIME,
+        AVG_RUNNING,
+        AVG_QUEUED_LOAD + AVG_QUEUED_PROVISIONING as AVG_QUEUED
+    FROM TABLE(INFORMATION_SCHEMA.WAREHOUSE_LOAD_HISTORY(
+        DATE_RANGE_START => TO_TIMESTAMP_LTZ({to_epoch(since.floor('5min'))})
+    ))
+    """
+    return run_query(session, query)
+
+
+def merge_delta(existing, delta, keys):
+    """Append a polled delta, keeping the latest version of each key."""
+    if existing is None or existing.empty:
+        return delta.drop_duplicates(keys, keep='last').reset_index(drop=True)
+    if delta.empty:
+        return existing
+    return pd.concat([existing, delta], ignore_index=True).drop_duplicates(keys, keep='last').reset_index(drop=True)
+
+
+class LiveTail:
+    """Per-session buffer of INFORMATION_SCHEMA rows newer than the cutoff.
+
+    Each poll only asks for rows since the last watermark (less a small
+    overlap), and merges them by key so running queries and the current
+    metering hour are updated in place. `truncated_until` is set while a
+    poll that hit QUERY_RESULT_LIMIT leaves queries before it missing.
+    """
+
+    def __init__(self, cutoff):
+        self.cutoff = cutoff
+        self.watermark = cutoff
+        self.queries = pd.DataFrame()
+        self.metering = pd.DataFrame()
+        self.load = pd.DataFrame()
+        self.polls = 0
+        self.last_poll_secs = 0.0
+        self.last_delta_rows = 0
+        self.truncated_until = None
+
+    def poll(self, session):
+        started = time.time()
+        polled_at = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        since = self.watermark - pd.Timedelta(seconds=POLL_OVERLAP_SECS)
+        queries = fetch_query_tail(session, since)
+        if len(queries) >= QUERY_RESULT_LIMIT:
+            # Only the most recent queries came back; older ones since the
+            # watermark are missing until ACCOUNT_USAGE covers them.
+            self.truncated_until = polled_at
+        metering = fetch_metering_tail(session, since)
+        load = fetch_load_tail(session, since)
+        self.queries = merge_delta(self.queries, queries, ['QUERY_ID'])
+        self.metering = merge_delta(self.metering, metering, ['WAREHOUSE_NAME', 'START_TIME'])
+        self.load = merge_delta(self.load, load, ['WAREHOUSE_NAME', 'START_TIME'])
+        self.watermark = polled_at
+        self.polls += 1
+        self.last_poll_secs = time.time() - started
+        self.last_delta_rows = len(queries) + len(metering) + len(load)
+
+    def advance(self, cutoff):
+        """Drop rows that ACCOUNT_USAGE now covers once the cutoff moves on."""
+        if cutoff <= self.cutoff:
+            return
+        self.cutoff = cutoff
+        if self.truncated_until is not None and cutoff >= self.truncated_until:
+            self.truncated_until = None
+        if not self.queries.empty:
+            self.queries = self.queries[self.queries['START_TIME'] >= cutoff].reset_index(drop=True)
+        if not self.metering.empty:
+            self.metering = self.metering[self.metering['START_TIME'] >= cutoff].reset_index(drop=True)
+        if not self.load.empty:
+            self.load = self.load[self.load['START_TIME'] >= cutoff].reset_index(drop=True)
+
+
+def stitch(history, live, cutoff, time_column):
+    """History before the cutoff followed by live rows from the cutoff on."""
+    history = history[history[time_column] < cutoff].assign(SOURCE='ACCOUNT_USAGE')
+    if live.empty:
+        return history
+    live = live[live[time_column] >= cutoff].assign(SOURCE='Live')
+    return pd.concat([history, live], ignore_index=True)
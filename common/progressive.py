@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import as_completed
+
+import pandas as pd
+import streamlit as st
+
+from common.execution import context_pool
+
+MAX_WORKERS = 8
+SKELETON_HTML = "<div style='height:{height}px;background:#f0f2f6;border-radius:0.5rem;opacity:0.6'></div>"
+
+
+def skeleton(slot, height=80):
+    slot.markdown(SKELETON_HTML.format(height=height), unsafe_allow_html=True)
+
+
+class ProgressiveLoader:
+    """Fetch a page's datasets concurrently and draw each section as soon as
+    the datasets it needs have arrived.
+
+    Sections are laid out as skeleton placeholders up front, so the time to
+    first paint depends on the fastest query rather than the slowest.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._fetches = {}
+        self._sections = []
+        self.timings = []
+
+    def fetch(self, name, fn, *args):
+        self._fetches[name] = (fn, args)
+
+    def section(self, name, slot, needs, draw, height=80):
+        skeleton(slot, height)
+        self._sections.append((name, slot, tuple(needs), draw))
+
+    def _draw_ready(self, results, started):
+        pending = []
+        for name, slot, needs, draw in self._sections:
+            if all(n in results for n in needs):
+                with slot.container():
+                    draw(*[results[n] for n in needs])
+                self.timings.append({"KIND": "section", "NAME": name, "SECS": None, "READY_AT_SECS": time.perf_counter() - started})
+            else:
+                pending.append((name, slot, needs, draw))
+        self._sections = pending
+
+    def run(self):
+        started = time.perf_counter()
+        results = {}
+
+        def timed(fn, args):
+            begin = time.perf_counter()
+            value = fn(*args)
+            return value, time.perf_counter() - begin
+
+        pool = context_pool(min(MAX_WORKERS, max(len(self._fetches), 1)))
+        try:
+            futures = {pool.submit(timed, fn, args): name for name, (fn, args) in self._fetches.items()}
+            self._draw_ready(results, started)
+            for future in as_completed(futures):
+                name = futures[future]
+                results[name], secs = future.result()
+                self.timings.append({"KIND": "dataset", "NAME": name, "SECS": secs, "READY_AT_SECS": time.perf_counter() - started})
+                self._draw_ready(results, started)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        st.session_state.setdefault("load_timings", {})[self.page] = pd.DataFrame(self.timings)
+        return results
+
+
+def show_timings(page):
+    timings = st.session_state.get("load_timings", {}).get(page)
+    if timings is None or timings.empty:
+        return
+    with st.expander("Load timings"):
+        first_paint = timings[timings['KIND'] == 'section']['READY_AT_SECS'].min()
+        st.caption(f"First section drawn after {first_paint:.2f}s, page complete after {timings['READY_AT_SECS'].max():.2f}s")
+        st.dataframe(timings.sort_values('READY_AT_SECS'), use_container_width=True)
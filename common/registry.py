@@ -0,0 +1,215 @@
+from datetime import timedelta
+
+import pandas as pd
+
+from common.execution import run_query
+from common.incremental import daily_dataset, utc_day, utc_window
+from common.live import account_usage_cutoff
+
+# View -> (time column, whether it is a TIMESTAMP_LTZ to bucket by UTC day).
+VIEWS = {
+    'QUERY_HISTORY': ('START_TIME', True),
+    'WAREHOUSE_METERING_HISTORY': ('START_TIME', True),
+    'STORAGE_USAGE': ('USAGE_DATE', False),
+}
+GRAINS = {'DAY': None, 'WEEK': 'W-SUN', 'MONTH': 'M'}
+ROLLUP = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+REGISTRY = {}
+
+
+class Dataset:
+    """A declared aggregate over one ACCOUNT_USAGE view.
+
+    `measures` maps an output column to (aggregation, SQL expression) with
+    aggregation one of sum, count, avg, min or max, so daily partials can be
+    rolled up locally. `dimensions` are grouped columns and `filters` are
+    columns a page may restrict at load time. `grain` keeps a DAY, WEEK or
+    MONTH date column; without it the window is rolled up to one row per
+    dimension. `days` gives a fixed trailing window of complete days, ending
+    before ACCOUNT_USAGE's latency cutoff, for datasets that do not follow
+    the page's time period.
+    """
+
+    def __init__(self, name, view, measures, dimensions=(), grain=None, filters=(), days=None, order_by=None, limit=None):
+        self.name = name
+        self.view = view
+        self.measures = measures
+        self.dimensions = tuple(dimensions)
+        self.grain = grain
+        self.filters = tuple(filters)
+        self.days = days
+        self.order_by = order_by
+        self.limit = limit
+
+    @property
+    def grouping(self):
+        return tuple(sorted(set(self.dimensions + self.filters)))
+
+
+def register(name, view, measures, **options):
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view {view!r}")
+    if options.get('grain') not in (None, *GRAINS):
+        raise ValueError(f"Unknown grain {options['grain']!r}")
+    for other in REGISTRY.values():
+        if other.view != view:
+            continue
+        for measure, definition in measures.items():
+            if other.measures.get(measure, definition) != definition:
+                raise ValueError(f"Measure {measure} of {name} conflicts with {other.name}")
+    REGISTRY[name] = Dataset(name, view, measures, **options)
+    return REGISTRY[name]
+
+
+def plan(view):
+    """Columns, grouping sets and measures of the one scan that serves every dataset on `view`."""
+    datasets = [d for d in REGISTRY.values() if d.view == view]
+    measures = {}
+    for d in datasets:
+        measures.update(d.measures)
+    sets = sorted({d.grouping for d in datasets})
+    columns = sorted({c for s in sets for c in s})
+    return columns, sets, measures
+
+
+def _partials(measures):
+    selects = []
+    for measure, (agg, expr) in measures.items():
+        if agg == 'avg':
+            selects.append(f"SUM({expr}) as {measure}__SUM")
+            selects.append(f"COUNT({expr}) as {measure}__COUNT")
+        else:
+            selects.append(f"{agg.upper()}({expr}) as {measure}")
+    return selects
+
+
+def scan_sql(view, start, end):
+    time_column, timestamp = VIEWS[view]
+    columns, sets, measures = plan(view)
+    day = utc_day(time_column) if timestamp else time_column
+    window = utc_window(time_column, start, end) if timestamp else f"{time_column} >= '{start}' AND {time_column} < '{end}'"
+    selects = [f"{day} as USAGE_DATE", *columns]
+    if columns:
+        selects.append(f"GROUPING_ID({', '.join(columns)}) as GROUPING_SET")
+    selects += _partials(measures)
+    grouping_sets = ', '.join(f"({', '.join(('USAGE_DATE',) + s)})" for s in sets)
+    select_list = ',\n        '.join(selects)
+    return f"""
+    SELECT
+        {select_list}
+    FROM SNOWFLAKE.ACCOUNT_USAGE.{view}
+    WHERE {window}
+    GROUP BY GROUPING SETS ({grouping_sets})
+    """
+
+
+@daily_dataset(ttl=3600)
+def get_view_scan(_session, start, end, view):
+    return run_query(_session, scan_sql(view, start, end))
+
+
+def _grouping_id(columns, grouping):
+    return sum(1 << (len(columns) - 1 - i) for i, c in enumerate(columns) if c not in grouping)
+
+
+def load(session, name, start=None, end=None, filters=None):
+    """Fetch a registered dataset by rolling up its view's shared daily scan.
+
+    Every dataset on a view is computed by the same GROUPING SETS query, and
+    the scan is cached per day, so pages asking for different datasets over
+    the same window share one scan. `filters` maps filter columns to the
+    values to keep.
+    """
+    ds = REGISTRY[name]
+    if ds.days is not None:
+        end = account_usage_cutoff().normalize().date()
+        start = end - timedelta(days=ds.days)
+    columns, _, _ = plan(ds.view)
+    rows = get_view_scan(session, start, end, ds.view)
+    if rows.empty:
+        return pd.DataFrame(columns=list(ds.dimensions) + (['USAGE_DATE'] if ds.grain else []) + list(ds.measures))
+    if columns:
+        rows = rows[rows['GROUPING_SET'] == _grouping_id(columns, ds.grouping)]
+    for column, values in (filters or {}).items():
+        if column not in ds.filters:
+            raise ValueError(f"{name} cannot be filtered on {column}")
+        rows = rows[rows[column].isin(list(values))]
+
+    keys = list(ds.dimensions)
+    if ds.grain:
+        rows = rows.assign(USAGE_DATE=pd.to_datetime(rows['USAGE_DATE']))
+        if GRAINS[ds.grain]:
+            rows['USAGE_DATE'] = rows['USAGE_DATE'].dt.to_period(GRAINS[ds.grain]).dt.start_time
+        keys.append('USAGE_DATE')
+    aggregations = {}
+    for measure, (agg, _) in ds.measures.items():
+        if agg == 'avg':
+            aggregations[f"{measure}__SUM"] = 'sum'
+            aggregations[f"{measure}__COUNT"] = 'sum'
+        else:
+            aggregations[measure] = ROLLUP[agg]
+    if keys:
+        result = rows.groupby(keys, as_index=False, dropna=False).agg(aggregations)
+    else:
+        result = rows.agg(aggregations).to_frame().T.infer_objects() if not rows.empty else pd.DataFrame(columns=list(aggregations))
+    for measure, (agg, _) in ds.measures.items():
+        if agg == 'avg':
+            result[measure] = result[f"{measure}__SUM"] / result[f"{measure}__COUNT"].where(result[f"{measure}__COUNT"] > 0)
+    result = result[keys + list(ds.measures)]
+    if ds.order_by:
+        result = result.sort_values(ds.order_by, ascending=False)
+    elif keys:
+        result = result.sort_values(keys)
+    if ds.limit:
+        result = result.head(ds.limit)
+    return result.reset_index(drop=True)
+
+
+TB = "POWER(1024, 4)"
+
+register('query_summary', 'QUERY_HISTORY', {
+    'TOTAL_QUERIES': ('count', '*'),
+    'SUCCESSFUL': ('sum', "IFF(EXECUTION_STATUS = 'SUCCESS', 1, 0)"),
+    'FAILED': ('sum', "IFF(EXECUTION_STATUS != 'SUCCESS', 1, 0)"),
+    'AVG_DURATION_SECS': ('avg', "TOTAL_ELAPSED_TIME / 1000"),
+    'MAX_DURATION_SECS': ('max', "TOTAL_ELAPSED_TIME / 1000"),
+    'TB_SCANNED': ('sum', f"BYTES_SCANNED / {TB}"),
+})
+
+register('daily_query_volume', 'QUERY_HISTORY', {
+    'TOTAL_QUERIES': ('count', '*'),
+    'SUCCESSFUL': ('sum', "IFF(EXECUTION_STATUS = 'SUCCESS', 1, 0)"),
+    'FAILED': ('sum', "IFF(EXECUTION_STATUS != 'SUCCESS', 1, 0)"),
+}, grain='DAY')
+
+register('daily_credits', 'WAREHOUSE_METERING_HISTORY', {
+    'CREDITS': ('sum', 'CREDITS_USED'),
+    'CLOUD_SERVICES_CREDITS': ('sum', 'CREDITS_USED_CLOUD_SERVICES'),
+}, grain='DAY', filters=['WAREHOUSE_NAME'])
+
+register('weekly_credits', 'WAREHOUSE_METERING_HISTORY', {
+    'CREDITS': ('sum', 'CREDITS_USED'),
+    'CLOUD_SERVICES_CREDITS': ('sum', 'CREDITS_USED_CLOUD_SERVICES'),
+}, grain='WEEK', filters=['WAREHOUSE_NAME'])
+
+register('warehouse_credits', 'WAREHOUSE_METERING_HISTORY', {
+    'CREDITS': ('sum', 'CREDITS_USED'),
+}, dimensions=['WAREHOUSE_NAME'], order_by='CREDITS', limit=10)
+
+# Metering has one row per warehouse and hour it was running.
+register('warehouse_usage', 'WAREHOUSE_METERING_HISTORY', {
+    'CREDITS': ('sum', 'CREDITS_USED'),
+    'ACTIVE_HOURS': ('count', '*'),
+}, dimensions=['WAREHOUSE_NAME'], order_by='CREDITS')
+
+register('storage_summary', 'STORAGE_USAGE', {
+    'TOTAL_TB': ('avg', f"(STORAGE_BYTES + STAGE_BYTES + FAILSAFE_BYTES) / {TB}"),
+}, days=7)
+
+register('daily_storage', 'STORAGE_USAGE', {
+    'STORAGE_TB': ('avg', f"STORAGE_BYTES / {TB}"),
+    'STAGE_TB': ('avg', f"STAGE_BYTES / {TB}"),
+    'FAILSAFE_TB': ('avg', f"FAILSAFE_BYTES / {TB}"),
+    'TOTAL_TB': ('avg', f"(STORAGE_BYTES + STAGE_BYTES + FAILSAFE_BYTES) / {TB}"),
+}, grain='DAY', days=90)
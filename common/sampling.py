@@ -0,0 +1,79 @@
+import numpy as np
+
+Z_95 = 1.96
+SAMPLE_RATES = [1, 5, 10, 25, 50]
+
+
+def sample_clause(rate):
+    """Row-sampling clause for a FROM item; empty in exact mode (rate 100)."""
+    return f"SAMPLE ROW ({rate})" if rate < 100 else ""
+
+
+def count_interval(sampled, rate):
+    """Scaled-up count and its 95% interval from a Bernoulli row sample."""
+    p = rate / 100
+    sampled = np.asarray(sampled, dtype=float)
+    half = Z_95 * np.sqrt(sampled * (1 - p)) / p
+    estimate = sampled / p
+    return estimate, np.maximum(estimate - half, 0), estimate + half
+
+
+def sum_interval(sampled_sum, sampled_sum_sq, rate):
+    """Horvitz-Thompson scaled sum and its 95% interval."""
+    p = rate / 100
+    estimate = np.asarray(sampled_sum, dtype=float) / p
+    half = Z_95 * np.sqrt(np.asarray(sampled_sum_sq, dtype=float) * (1 - p)) / p
+    return estimate, np.maximum(estimate - half, 0), estimate + half
+
+
+def mean_interval(mean, stddev, n):
+    mean = np.asarray(mean, dtype=float)
+    half = Z_95 * np.nan_to_num(np.asarray(stddev, dtype=float)) / np.sqrt(np.maximum(np.asarray(n, dtype=float), 1))
+    return mean, mean - half, mean + half
+
+
+def mean_of_means_interval(means, lows, highs):
+    """Interval for the unweighted mean of independent group means."""
+    means = np.asarray(means, dtype=float)
+    halves = (np.asarray(highs, dtype=float) - np.asarray(lows, dtype=float)) / 2
+    estimate = means.mean()
+    half = np.sqrt((halves ** 2).sum()) / len(means)
+    return estimate, estimate - half, estimate + half
+
+
+def proportion_interval(k, n):
+    p_hat = k / n if n else 0.0
+    half = Z_95 * np.sqrt(p_hat * (1 - p_hat) / n) if n else 0.0
+    return p_hat, max(p_hat - half, 0.0), min(p_hat + half, 1.0)
+
+
+def estimate(df, rate, counts=(), sums=None, means=None):
+    """Scale a sampled aggregate frame back up and attach _LOW/_HIGH bounds.
+
+    `sums` maps a SUM column to its SUM of squares column and `means` maps an
+    AVG column to its (STDDEV column, sample count column). The helper
+    columns are dropped, so exact results (rate 100) come back unchanged.
+    """
+    sums = sums or {}
+    means = means or {}
+    df = df.copy()
+    helpers = list(sums.values()) + [std for std, _ in means.values()]
+    if rate < 100 and not df.empty:
+        for column, (std_column, n_column) in means.items():
+            _, df[f"{column}_LOW"], df[f"{column}_HIGH"] = mean_interval(df[column], df[std_column], df[n_column])
+        for column, sum_sq_column in sums.items():
+            df[column], df[f"{column}_LOW"], df[f"{column}_HIGH"] = sum_interval(df[column], df[sum_sq_column], rate)
+        for column in counts:
+            df[column], df[f"{column}_LOW"], df[f"{column}_HIGH"] = count_interval(df[column], rate)
+            df[column] = df[column].round().astype(int)
+    return df.drop(columns=[c for c in helpers if c in df.columns])
+
+
+def error_bars(data, value, category, sort):
+    """Horizontal 95% interval rules to layer over a bar chart."""
+    import altair as alt
+    return alt.Chart(data).mark_rule(color='#11567F', strokeWidth=2).encode(
+        x=f'{value}_LOW:Q',
+        x2=f'{value}_HIGH:Q',
+        y=alt.Y(f'{category}:N', sort=sort)
+    )
@@ -0,0 +1,51 @@
+import altair as alt
+import pandas as pd
+
+# Naive timestamps reach the browser as UTC epochs. Drawing them on a UTC
+# scale keeps the axis, and so a brushed range, in the data's own time.
+UTC_SCALE = alt.Scale(type='utc')
+
+
+def selected_values(state, param, field):
+    """Values of `field` picked by a point selection named `param`.
+
+    With a tuple of fields each pick is returned as a tuple of their values.
+    """
+    if not state:
+        return []
+    points = state.get("selection", {}).get(param) or []
+    if isinstance(field, tuple):
+        return [tuple(p[f] for f in field) for p in points if all(f in p for f in field)]
+    return [p[field] for p in points if field in p]
+
+
+def selected_range(state, param, field):
+    """(start, end) timestamps of an interval selection over a temporal field.
+
+    The brushed chart should draw `field` on UTC_SCALE so that the range the
+    viewer sees is the range returned.
+    """
+    if not state:
+        return None
+    bounds = (state.get("selection", {}).get(param) or {}).get(field)
+    if not bounds:
+        return None
+    return pd.to_datetime(min(bounds), unit="ms"), pd.to_datetime(max(bounds), unit="ms")
+
+
+def filter_values(df, field, values):
+    if not values or df.empty:
+        return df
+    if isinstance(field, tuple):
+        return df[pd.MultiIndex.from_frame(df[list(field)]).isin(values)].copy()
+    return df[df[field].isin(values)].copy()
+
+
+def filter_range(df, field, bounds):
+    if bounds is None or df.empty:
+        return df
+    return df[(df[field] >= bounds[0]) & (df[field] <= bounds[1])].copy()
+
+
+def highlight(selection, color='#29B5E8', muted='#C9E9F6'):
+    return alt.condition(selection, alt.value(color), alt.value(muted))
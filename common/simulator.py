@@ -0,0 +1,84 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+CREDITS_PER_HOUR = {
+    'X-Small': 1, 'Small': 2, 'Medium': 4, 'Large': 8, 'X-Large': 16, '2X-Large': 32,
+    '3X-Large': 64, '4X-Large': 128, '5X-Large': 256, '6X-Large': 512,
+}
+MAX_CONCURRENCY_LEVEL = 8
+MIN_BILLED_SECS = 60
+
+
+def credits_per_hour_sql(column='WAREHOUSE_SIZE'):
+    """SQL CASE mapping a warehouse size column to its hourly credit rate."""
+    whens = ' '.join(f"WHEN '{size}' THEN {rate}" for size, rate in CREDITS_PER_HOUR.items())
+    return f"CASE {column} {whens} END"
+
+
+def _sweep(starts, durations, size_factors, size):
+    """Concurrency step function of the workload replayed on `size`.
+
+    Execution time is assumed to scale inversely with warehouse size.
+    Returns segment durations and the number of running queries in each.
+    """
+    scaled = durations * size_factors / CREDITS_PER_HOUR[size]
+    times = np.concatenate([starts, starts + scaled])
+    deltas = np.concatenate([np.ones(len(starts), dtype=np.int32), -np.ones(len(starts), dtype=np.int32)])
+    order = np.lexsort((deltas, times))
+    level = np.cumsum(deltas[order])[:-1]
+    dt = np.diff(times[order])
+    return dt, level
+
+
+def _replay(dt, level, auto_suspend, min_clusters, max_clusters):
+    idle = level == 0
+    suspends = idle & (dt > auto_suspend)
+    running = np.where(idle, np.minimum(dt, auto_suspend), dt)
+    clusters = np.where(
+        idle,
+        min_clusters,
+        np.clip(np.ceil(level / MAX_CONCURRENCY_LEVEL), min_clusters, max_clusters)
+    )
+    session = np.concatenate([[0], np.cumsum(suspends)[:-1]]) if len(dt) else np.zeros(0, dtype=int)
+    session_secs = np.bincount(session, weights=running * clusters, minlength=suspends.sum() + 1)
+    session_secs[-1] += auto_suspend * min_clusters
+    cluster_secs = np.maximum(session_secs, MIN_BILLED_SECS * min_clusters).sum()
+    queued = np.clip(level - max_clusters * MAX_CONCURRENCY_LEVEL, 0, None)
+    return {
+        'CLUSTER_HOURS': cluster_secs / 3600,
+        'RESUMES': int(suspends.sum()) + 1,
+        'QUEUED_QUERY_HOURS': float((queued * dt).sum() / 3600),
+        'PEAK_CONCURRENCY': int(level.max()) if len(level) else 0,
+    }
+
+
+def simulate(queries, auto_suspends, sizes, cluster_ranges):
+    """Replay query intervals against every combination of settings.
+
+    `queries` needs START_EPOCH (seconds), EXECUTION_SECS and WAREHOUSE_SIZE
+    columns. Returns one row per configuration with projected credits,
+    cold-start resumes and queueing.
+    """
+    queries = queries[queries['WAREHOUSE_SIZE'].isin(list(CREDITS_PER_HOUR))]
+    if queries.empty:
+        return pd.DataFrame()
+    starts = queries['START_EPOCH'].to_numpy(dtype=np.float64)
+    durations = queries['EXECUTION_SECS'].to_numpy(dtype=np.float64)
+    size_factors = queries['WAREHOUSE_SIZE'].map(CREDITS_PER_HOUR).to_numpy(dtype=np.float64)
+
+    rows = []
+    for size in sizes:
+        dt, level = _sweep(starts, durations, size_factors, size)
+        for auto_suspend, (min_clusters, max_clusters) in itertools.product(auto_suspends, cluster_ranges):
+            result = _replay(dt, level, auto_suspend, min_clusters, max_clusters)
+            rows.append({
+                'WAREHOUSE_SIZE': size,
+                'AUTO_SUSPEND': auto_suspend,
+                'MIN_CLUSTERS': min_clusters,
+                'MAX_CLUSTERS': max_clusters,
+                'CREDITS': result['CLUSTER_HOURS'] * CREDITS_PER_HOUR[size],
+                **result,
+            })
+    return pd.DataFrame(rows)
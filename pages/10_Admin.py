@@ -0,0 +1,79 @@
+import streamlit as st
+import pandas as pd
+from common.cache import CACHE
+from common.execution import begin_run, cancelled_count, STATEMENT_TIMEOUT_SECS
+from common.registry import REGISTRY
+
+begin_run()
+
+st.title("Admin")
+
+st.subheader("Dataset Cache")
+st.caption("Shared by all sessions of this app instance")
+
+col1, col2, col3, col4, col5 = st.columns(5)
+with col1:
+    st.metric("Resident", f"{CACHE.resident_bytes / 1024 / 1024:,.1f} MB")
+with col2:
+    st.metric("Budget", f"{CACHE.budget_bytes / 1024 / 1024:,.0f} MB")
+with col3:
+    st.metric("Utilization", f"{CACHE.resident_bytes / CACHE.budget_bytes * 100:.1f}%")
+with col4:
+    st.metric("Eviction Policy", CACHE.policy.upper())
+with col5:
+    st.metric("Duplicate Queries Avoided", f"{CACHE.coalesced():,}", help="Concurrent misses that waited for another session's in-flight query instead of running their own")
+
+stats = CACHE.stats()
+st.subheader("Per-Dataset Counters")
+if not stats.empty:
+    st.dataframe(stats, use_container_width=True)
+else:
+    st.info("No datasets loaded yet")
+
+entries = CACHE.entries()
+st.subheader("Resident Entries")
+st.caption("Most recently used first")
+if not entries.empty:
+    st.dataframe(entries, use_container_width=True)
+else:
+    st.info("Cache is empty")
+
+st.subheader("Query Execution")
+col1, col2 = st.columns(2)
+with col1:
+    st.metric("Statement Timeout", f"{STATEMENT_TIMEOUT_SECS:,}s")
+with col2:
+    st.metric("Superseded Queries Cancelled", f"{cancelled_count():,}", help="Queries from abandoned reruns in this session that were cancelled")
+
+st.subheader("Dataset Registry")
+st.caption("Declared datasets and the shared daily scan that serves each source view")
+st.dataframe(pd.DataFrame([{
+    'DATASET': d.name,
+    'VIEW': d.view,
+    'MEASURES': ', '.join(d.measures),
+    'DIMENSIONS': ', '.join(d.dimensions),
+    'FILTERS': ', '.join(d.filters),
+    'GRAIN': d.grain or '',
+    'WINDOW': f"Last {d.days} days" if d.days else 'Page period',
+} for d in REGISTRY.values()]), use_container_width=True)
+
+st.subheader("Page Load Timings")
+st.caption("Most recent load of each page in this session")
+load_timings = st.session_state.get("load_timings", {})
+if load_timings:
+    summary = pd.DataFrame([
+        {
+            'PAGE': page,
+            'FIRST_SECTION_SECS': timings[timings['KIND'] == 'section']['READY_AT_SECS'].min(),
+            'COMPLETE_SECS': timings['READY_AT_SECS'].max(),
+            'SLOWEST_DATASET': timings[timings['KIND'] == 'dataset'].sort_values('SECS')['NAME'].iloc[-1] if (timings['KIND'] == 'dataset').any() else None
+        }
+        for page, timings in load_timings.items() if not timings.empty
+    ])
+    st.dataframe(summary, use_container_width=True)
+else:
+    st.info("No pages loaded yet")
+
+if st.button("Clear Cache"):
+    CACHE.clear()
+    st.rerun()
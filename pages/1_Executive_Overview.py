@@ -1,137 +1,81 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from snowflake.snowpark.context import get_active_session
 from datetime import datetime, timedelta
+from common.accounts import account_filter, fan_out
+from common.selection import selected_values, filter_values, highlight
+from common.execution import begin_run
+from common.registry import load
+from common.progressive import ProgressiveLoader, show_timings
 
-session = get_active_session()
+accounts = account_filter()
+begin_run()
 
 st.title("Executive Overview")
 
-days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90], index=2, format_func=lambda x: f"Last {x} days")
+days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90, 180, 365], index=2, format_func=lambda x: f"Last {x} days")
 
 end_date = datetime.now().date()
 start_date = end_date - timedelta(days=days_back)
 prev_start = start_date - timedelta(days=days_back)
 prev_end = start_date
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_credit_summary(_session, start, end, prev_start, prev_end):
-    query = f"""
-    WITH current_period AS (
-        SELECT COALESCE(SUM(CREDITS_USED), 0) as total_credits
-        FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-        WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    ),
-    previous_period AS (
-        SELECT COALESCE(SUM(CREDITS_USED), 0) as total_credits
-        FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-        WHERE START_TIME >= '{prev_start}' AND START_TIME < '{prev_end}'
-    )
-    SELECT 
-        c.total_credits as current_credits,
-        p.total_credits as previous_credits
-    FROM current_period c, previous_period p
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_daily_credits(_session, start, end):
-    query = f"""
-    SELECT 
-        DATE_TRUNC('DAY', START_TIME)::DATE as USAGE_DATE,
-        ROUND(SUM(CREDITS_USED), 2) as CREDITS,
-        ROUND(SUM(CREDITS_USED_CLOUD_SERVICES), 2) as CLOUD_SERVICES_CREDITS
-    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    GROUP BY 1
-    ORDER BY 1
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_warehouse_breakdown(_session, start, end):
-    query = f"""
-    SELECT 
-        WAREHOUSE_NAME,
-        ROUND(SUM(CREDITS_USED), 2) as CREDITS
-    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    GROUP BY 1
-    ORDER BY 2 DESC
-    LIMIT 10
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_query_summary(_session, start, end):
-    query = f"""
-    SELECT 
-        COUNT(*) as TOTAL_QUERIES,
-        COUNT_IF(EXECUTION_STATUS = 'SUCCESS') as SUCCESSFUL,
-        COUNT_IF(EXECUTION_STATUS != 'SUCCESS') as FAILED,
-        ROUND(AVG(TOTAL_ELAPSED_TIME) / 1000, 2) as AVG_DURATION_SECS
-    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_storage_summary(_session):
-    query = """
-    SELECT 
-        ROUND(AVG(STORAGE_BYTES + STAGE_BYTES + FAILSAFE_BYTES) / POWER(1024, 4), 2) as TOTAL_TB
-    FROM SNOWFLAKE.ACCOUNT_USAGE.STORAGE_USAGE
-    WHERE USAGE_DATE >= DATEADD('day', -7, CURRENT_DATE())
-    """
-    return _session.sql(query).to_pandas()
-
-def get_warehouse_usage_summary(_session, start, end):
-    query = f"""
-    SELECT 
-        WAREHOUSE_NAME,
-        ROUND(SUM(CREDITS_USED), 2) as CREDITS_USED,
-        COUNT(DISTINCT DATE_TRUNC('HOUR', START_TIME)) as ACTIVE_HOURS,
-        ROUND(SUM(CREDITS_USED) / NULLIF(COUNT(DISTINCT DATE_TRUNC('HOUR', START_TIME)), 0), 2) as CREDITS_PER_HOUR
-    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    GROUP BY 1
-    ORDER BY 2 DESC
-    """
-    return _session.sql(query).to_pandas()
-
-with st.spinner("Loading overview..."):
-    summary = get_credit_summary(session, start_date, end_date, prev_start, prev_end)
-    daily = get_daily_credits(session, start_date, end_date)
-    warehouses = get_warehouse_breakdown(session, start_date, end_date)
-    queries = get_query_summary(session, start_date, end_date)
-    storage = get_storage_summary(session)
-    wh_usage = get_warehouse_usage_summary(session, start_date, end_date)
-
-current = summary['CURRENT_CREDITS'].iloc[0] if not summary.empty else 0
-previous = summary['PREVIOUS_CREDITS'].iloc[0] if not summary.empty else 0
-delta = ((current - previous) / previous * 100) if previous > 0 else 0
-
-col1, col2, col3, col4 = st.columns(4)
-with col1:
+def get_credit_summary(session, start, end, prev_start, prev_end):
+    current = load(session, 'daily_credits', start, end)['CREDITS'].sum()
+    previous = load(session, 'daily_credits', prev_start, prev_end)['CREDITS'].sum()
+    return pd.DataFrame({'CURRENT_CREDITS': [current], 'PREVIOUS_CREDITS': [previous]})
+
+def get_warehouse_usage_summary(session, start, end):
+    usage = load(session, 'warehouse_usage', start, end)
+    usage['CREDITS_PER_HOUR'] = usage['CREDITS'] / usage['ACTIVE_HOURS'].where(usage['ACTIVE_HOURS'] > 0)
+    return usage.round(2)
+
+def get_daily_credits(session, start, end, selected):
+    filters = {'WAREHOUSE_NAME': [w for a, w in selected if a == session.account]} if selected else None
+    return load(session, 'daily_credits', start, end, filters)
+
+def warehouse_label(account, warehouse):
+    return f"{warehouse} ({account})" if len(accounts) > 1 else warehouse
+
+WAREHOUSE_KEY = ('ACCOUNT_NAME', 'WAREHOUSE_NAME')
+selected_warehouses = selected_values(st.session_state.get("top_warehouses_chart"), "warehouse", WAREHOUSE_KEY)
+
+loader = ProgressiveLoader("Executive Overview")
+loader.fetch('summary', fan_out, get_credit_summary, accounts, start_date, end_date, prev_start, prev_end)
+loader.fetch('daily', fan_out, get_daily_credits, accounts, start_date, end_date, tuple(selected_warehouses))
+loader.fetch('warehouses', fan_out, load, accounts, 'warehouse_credits', start_date, end_date)
+loader.fetch('queries', fan_out, load, accounts, 'query_summary', start_date, end_date)
+loader.fetch('storage', fan_out, load, accounts, 'storage_summary')
+loader.fetch('wh_usage', fan_out, get_warehouse_usage_summary, accounts, start_date, end_date)
+
+def draw_total_credits(summary):
+    current = summary['CURRENT_CREDITS'].sum()
+    previous = summary['PREVIOUS_CREDITS'].sum()
+    delta = ((current - previous) / previous * 100) if previous > 0 else 0
     st.metric("Total Credits", f"{current:,.0f}", f"{delta:+.1f}% vs prev period")
-with col2:
-    total_queries = queries['TOTAL_QUERIES'].iloc[0] if not queries.empty else 0
+
+def draw_total_queries(queries):
+    total_queries = queries['TOTAL_QUERIES'].sum()
     st.metric("Total Queries", f"{total_queries:,}")
-with col3:
-    avg_duration = queries['AVG_DURATION_SECS'].iloc[0] if not queries.empty else 0
-    st.metric("Avg Query Duration", f"{avg_duration:.1f}s")
-with col4:
-    total_tb = storage['TOTAL_TB'].iloc[0] if not storage.empty else 0
-    st.metric("Storage", f"{total_tb:.2f} TB")
 
-st.markdown("---")
+def draw_avg_duration(queries):
+    total_queries = queries['TOTAL_QUERIES'].sum()
+    avg_duration = (queries['AVG_DURATION_SECS'].fillna(0) * queries['TOTAL_QUERIES']).sum() / total_queries if total_queries > 0 else 0
+    st.metric("Avg Query Duration", f"{avg_duration:.1f}s")
 
-col1, col2 = st.columns([2, 1])
+def draw_storage(storage):
+    total_tb = storage['TOTAL_TB'].sum()
+    st.metric("Storage", f"{total_tb:.2f} TB")
 
-with col1:
-    st.subheader("Daily Credit Consumption")
-    if not daily.empty:
+def draw_daily_credits(daily):
+    if daily['ACCOUNT_NAME'].nunique() > 1:
+        chart = alt.Chart(daily).mark_area(opacity=0.7).encode(
+            x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
+            y=alt.Y('CREDITS:Q', title='Credits', stack='zero'),
+            color=alt.Color('ACCOUNT_NAME:N', title='Account')
+        ).properties(height=300)
+        st.altair_chart(chart, use_container_width=True)
+    elif not daily.empty:
         chart = alt.Chart(daily).mark_area(
             color='#29B5E8',
             opacity=0.7,
@@ -144,21 +88,22 @@ with col1:
     else:
         st.info("No data for selected period")
 
-with col2:
-    st.subheader("Top Warehouses")
+def draw_top_warehouses(warehouses):
     if not warehouses.empty:
-        chart = alt.Chart(warehouses).mark_bar(color='#29B5E8').encode(
+        top = warehouses.groupby(list(WAREHOUSE_KEY), as_index=False)['CREDITS'].sum().nlargest(10, 'CREDITS')
+        top['WAREHOUSE'] = [warehouse_label(a, w) for a, w in zip(top['ACCOUNT_NAME'], top['WAREHOUSE_NAME'])]
+        warehouse_select = alt.selection_point(fields=list(WAREHOUSE_KEY), name='warehouse')
+        chart = alt.Chart(top).mark_bar().encode(
             x=alt.X('CREDITS:Q', title='Credits'),
-            y=alt.Y('WAREHOUSE_NAME:N', title='', sort='-x')
-        ).properties(height=300)
-        st.altair_chart(chart, use_container_width=True)
+            y=alt.Y('WAREHOUSE:N', title='', sort='-x'),
+            color=highlight(warehouse_select),
+            tooltip=['ACCOUNT_NAME:N', 'WAREHOUSE_NAME:N', 'CREDITS:Q']
+        ).add_params(warehouse_select).properties(height=300)
+        st.altair_chart(chart, use_container_width=True, on_select="rerun", key="top_warehouses_chart")
     else:
         st.info("No warehouse data")
 
-st.markdown("---")
-st.subheader("Credit Breakdown")
-col1, col2 = st.columns(2)
-with col1:
+def draw_credit_breakdown(daily):
     if not daily.empty:
         total_compute = daily['CREDITS'].sum()
         total_cs = daily['CLOUD_SERVICES_CREDITS'].sum()
@@ -167,18 +112,74 @@ with col1:
             'Credits': [total_compute, total_cs]
         })
         st.dataframe(breakdown_df, use_container_width=True)
-with col2:
+
+def draw_success_rate(queries):
     if not queries.empty:
-        success = queries['SUCCESSFUL'].iloc[0]
-        failed = queries['FAILED'].iloc[0]
+        success = queries['SUCCESSFUL'].sum()
+        failed = queries['FAILED'].sum()
         success_rate = (success / (success + failed) * 100) if (success + failed) > 0 else 0
         st.metric("Query Success Rate", f"{success_rate:.1f}%")
 
+def draw_warehouse_usage(wh_usage):
+    if not wh_usage.empty:
+        display_df = filter_values(wh_usage, WAREHOUSE_KEY, selected_warehouses).copy()
+        display_df.columns = ['Account', 'Warehouse', 'Credits Used', 'Active Hours', 'Credits/Hour']
+        st.dataframe(display_df, use_container_width=True)
+    else:
+        st.info("No warehouse usage data")
+
+def draw_account_totals(summary, queries, storage):
+    totals = summary.merge(queries[['ACCOUNT_NAME', 'TOTAL_QUERIES', 'FAILED']], on='ACCOUNT_NAME', how='outer')
+    totals = totals.merge(storage, on='ACCOUNT_NAME', how='outer')
+    totals['CHANGE_PCT'] = (totals['CURRENT_CREDITS'] - totals['PREVIOUS_CREDITS']) / totals['PREVIOUS_CREDITS'].where(totals['PREVIOUS_CREDITS'] > 0) * 100
+    totals = totals.sort_values('CURRENT_CREDITS', ascending=False)
+    chart = alt.Chart(totals).mark_bar(color='#29B5E8').encode(
+        x=alt.X('CURRENT_CREDITS:Q', title='Credits'),
+        y=alt.Y('ACCOUNT_NAME:N', title='', sort='-x')
+    ).properties(height=max(100, 30 * len(totals)))
+    st.altair_chart(chart, use_container_width=True)
+    display_df = totals[['ACCOUNT_NAME', 'CURRENT_CREDITS', 'PREVIOUS_CREDITS', 'CHANGE_PCT', 'TOTAL_QUERIES', 'FAILED', 'TOTAL_TB']].copy()
+    display_df.columns = ['Account', 'Credits', 'Previous Period', 'Change %', 'Queries', 'Failed Queries', 'Storage TB']
+    st.dataframe(display_df, use_container_width=True)
+
+col1, col2, col3, col4 = st.columns(4)
+loader.section("Total Credits", col1.empty(), ['summary'], draw_total_credits)
+loader.section("Total Queries", col2.empty(), ['queries'], draw_total_queries)
+loader.section("Avg Query Duration", col3.empty(), ['queries'], draw_avg_duration)
+loader.section("Storage", col4.empty(), ['storage'], draw_storage)
+
+if len(accounts) > 1:
+    st.markdown("---")
+    st.subheader("Credits by Account")
+    st.caption(f"Totals across {len(accounts)} accounts")
+    loader.section("Credits by Account", st.empty(), ['summary', 'queries', 'storage'], draw_account_totals, height=200)
+
+st.markdown("---")
+
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.subheader("Daily Credit Consumption")
+    if selected_warehouses:
+        st.caption(f"Filtered to: {', '.join(warehouse_label(a, w) for a, w in selected_warehouses)}")
+    loader.section("Daily Credit Consumption", st.empty(), ['daily'], draw_daily_credits, height=300)
+
+with col2:
+    st.subheader("Top Warehouses")
+    st.caption("Click a bar to filter the page")
+    loader.section("Top Warehouses", st.empty(), ['warehouses'], draw_top_warehouses, height=300)
+
+st.markdown("---")
+st.subheader("Credit Breakdown")
+col1, col2 = st.columns(2)
+loader.section("Credit Breakdown", col1.empty(), ['daily'], draw_credit_breakdown, height=110)
+loader.section("Query Success Rate", col2.empty(), ['queries'], draw_success_rate)
+
 st.markdown("---")
 st.subheader("Warehouse Usage Summary")
-if not wh_usage.empty:
-    display_df = wh_usage.copy()
-    display_df.columns = ['Warehouse', 'Credits Used', 'Active Hours', 'Credits/Hour']
-    st.dataframe(display_df, use_container_width=True)
-else:
-    st.info("No warehouse usage data")
+if selected_warehouses:
+    st.caption(f"Filtered to: {', '.join(warehouse_label(a, w) for a, w in selected_warehouses)}")
+loader.section("Warehouse Usage Summary", st.empty(), ['wh_usage'], draw_warehouse_usage, height=200)
+
+loader.run()
+show_timings("Executive Overview")
@@ -1,65 +1,74 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from snowflake.snowpark.context import get_active_session
 from datetime import datetime, timedelta
-
-session = get_active_session()
+from common.accounts import account_session
+from common.selection import UTC_SCALE, selected_values, selected_range, filter_range, highlight
+from common.cache import dataset
+from common.grain import plan_grain, GRAIN_LABELS
+from common.simulator import simulate, CREDITS_PER_HOUR
+from common.sampling import SAMPLE_RATES, sample_clause, estimate, error_bars, mean_of_means_interval, proportion_interval
+from common.execution import begin_run, run_query
+from common.registry import load
+from common.incremental import utc_window
+from common.progressive import ProgressiveLoader, show_timings
+
+session = account_session()
+begin_run()
 
 st.title("Warehouse Analysis")
 
-days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90], index=0, format_func=lambda x: f"Last {x} days")
+days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90, 180, 365], index=0, format_func=lambda x: f"Last {x} days")
 
 end_date = datetime.now().date()
 start_date = end_date - timedelta(days=days_back)
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_warehouses(_session, start, end):
-    query = f"""
-    SELECT DISTINCT WAREHOUSE_NAME
-    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    ORDER BY WAREHOUSE_NAME
-    """
-    return _session.sql(query).to_pandas()
+warehouses_df = load(session, 'warehouse_usage', start_date, end_date)
+warehouse_list = [(session.account, name) for name in sorted(warehouses_df['WAREHOUSE_NAME'].dropna())]
 
-warehouses_df = get_warehouses(session, start_date, end_date)
-warehouse_list = warehouses_df['WAREHOUSE_NAME'].tolist() if not warehouses_df.empty else []
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    selected_key = st.selectbox("Select Warehouse", warehouse_list, format_func=lambda key: key[1], placeholder="No warehouses found")
+    selected_warehouse = selected_key[1] if selected_key else None
+with col2:
+    approximate = st.toggle("Approximate (sampled)", help="Estimate cache and spilling ratios from a random sample of QUERY_HISTORY rows with 95% confidence intervals")
+with col3:
+    sample_rate = st.select_slider("Sample rate %", SAMPLE_RATES, value=10) if approximate else 100
 
-selected_warehouse = st.selectbox("Select Warehouse", warehouse_list if warehouse_list else ["No warehouses found"])
+if selected_warehouse:
 
-if warehouse_list and selected_warehouse != "No warehouses found":
-    
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_daily_credits(_session, warehouse, start, end):
-        query = f"""
-        SELECT 
-            DATE_TRUNC('DAY', START_TIME)::DATE as USAGE_DATE,
-            ROUND(SUM(CREDITS_USED), 2) as CREDITS
-        FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
+    @dataset(ttl=3600)
+    def get_grain_plan(_session, warehouse, start, end):
+        probe = f"""
+        SELECT COUNT(*)
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
-        GROUP BY 1
-        ORDER BY 1
+            AND {utc_window('START_TIME', start, end)}
         """
-        return _session.sql(query).to_pandas()
+        return plan_grain(_session, probe, start, end, series=4)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
+    @dataset(ttl=3600)
     def get_hourly_credits(_session, warehouse, start, end):
         query = f"""
         SELECT 
-            DATE_TRUNC('HOUR', START_TIME)::TIMESTAMP_NTZ as USAGE_HOUR,
+            DATE_TRUNC('HOUR', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_PERIOD,
             ROUND(SUM(CREDITS_USED), 4) as CREDITS,
             ROUND(SUM(CREDITS_USED_CLOUD_SERVICES), 4) as GS_CREDITS
         FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
         GROUP BY 1
         ORDER BY 1
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
+
+    def get_period_credits(session, warehouse, start, end, grain):
+        if grain == 'HOUR':
+            return get_hourly_credits(session, warehouse, start, end)
+        credits = load(session, 'daily_credits' if grain == 'DAY' else 'weekly_credits', start, end, {'WAREHOUSE_NAME': [warehouse]})
+        return credits.rename(columns={'USAGE_DATE': 'USAGE_PERIOD', 'CLOUD_SERVICES_CREDITS': 'GS_CREDITS'})
 
-    @st.cache_data(ttl=3600, show_spinner=False)
+    @dataset(ttl=3600)
     def get_warehouse_events(_session, warehouse, start, end):
         query = f"""
         SELECT 
@@ -68,44 +77,44 @@ if warehouse_list and selected_warehouse != "No warehouses found":
             CLUSTER_NUMBER
         FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_EVENTS_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND TIMESTAMP >= '{start}' AND TIMESTAMP < '{end}'
+            AND {utc_window('TIMESTAMP', start, end)}
             AND EVENT_NAME IN ('RESUME_WAREHOUSE', 'SUSPEND_WAREHOUSE')
         ORDER BY TIMESTAMP
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_warehouse_size_history(_session, warehouse, start, end):
+    @dataset(ttl=3600)
+    def get_warehouse_size_history(_session, warehouse, start, end, grain):
         query = f"""
         SELECT 
-            DATE_TRUNC('HOUR', START_TIME)::TIMESTAMP_NTZ as USAGE_HOUR,
+            DATE_TRUNC('{grain}', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_PERIOD,
             WAREHOUSE_SIZE,
             COUNT(*) as QUERY_COUNT
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
             AND WAREHOUSE_SIZE IS NOT NULL
         GROUP BY 1, 2
         ORDER BY 1
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_cluster_usage(_session, warehouse, start, end):
+    @dataset(ttl=3600)
+    def get_cluster_usage(_session, warehouse, start, end, grain):
         query = f"""
         SELECT 
-            DATE_TRUNC('HOUR', START_TIME)::TIMESTAMP_NTZ as USAGE_HOUR,
+            DATE_TRUNC('{grain}', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_PERIOD,
             COALESCE(CLUSTER_NUMBER, 0) as CLUSTER_NUMBER,
             COUNT(*) as QUERY_COUNT
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
         GROUP BY 1, 2
         ORDER BY 1, 2
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
+    @dataset(ttl=3600)
     def get_query_type_breakdown(_session, warehouse, start, end):
         query = f"""
         SELECT 
@@ -114,57 +123,77 @@ if warehouse_list and selected_warehouse != "No warehouses found":
             ROUND(SUM(TOTAL_ELAPSED_TIME) / 60000, 2) as DURATION_MINS
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
         GROUP BY 1
         ORDER BY 2 DESC
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_duration_breakdown(_session, warehouse, start, end):
+    @dataset(ttl=3600)
+    def get_duration_breakdown(_session, warehouse, start, end, grain):
         query = f"""
         SELECT 
-            DATE_TRUNC('HOUR', START_TIME)::TIMESTAMP_NTZ as USAGE_HOUR,
+            DATE_TRUNC('{grain}', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_PERIOD,
             ROUND(AVG(COMPILATION_TIME) / 1000, 2) as AVG_COMPILE_SECS,
             ROUND(AVG(QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME + QUEUED_OVERLOAD_TIME) / 1000, 2) as AVG_QUEUE_SECS,
             ROUND(AVG(EXECUTION_TIME) / 1000, 2) as AVG_EXEC_SECS
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
         GROUP BY 1
         ORDER BY 1
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_cache_usage(_session, warehouse, start, end):
+    @dataset(ttl=3600)
+    def get_duration_breakdown_by_type(_session, warehouse, query_types, start, end, grain):
+        type_list = ", ".join(f"'{t}'" for t in query_types)
         query = f"""
         SELECT 
-            DATE_TRUNC('HOUR', START_TIME)::TIMESTAMP_NTZ as USAGE_HOUR,
-            ROUND(AVG(PERCENTAGE_SCANNED_FROM_CACHE), 2) as PCT_FROM_CACHE
+            DATE_TRUNC('{grain}', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_PERIOD,
+            ROUND(AVG(COMPILATION_TIME) / 1000, 2) as AVG_COMPILE_SECS,
+            ROUND(AVG(QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME + QUEUED_OVERLOAD_TIME) / 1000, 2) as AVG_QUEUE_SECS,
+            ROUND(AVG(EXECUTION_TIME) / 1000, 2) as AVG_EXEC_SECS
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND QUERY_TYPE IN ({type_list})
+            AND {utc_window('START_TIME', start, end)}
+        GROUP BY 1
+        ORDER BY 1
+        """
+        return run_query(_session, query)
+
+    @dataset(ttl=3600)
+    def get_cache_usage(_session, warehouse, start, end, grain, sample_rate=100):
+        query = f"""
+        SELECT 
+            DATE_TRUNC('{grain}', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_PERIOD,
+            ROUND(AVG(PERCENTAGE_SCANNED_FROM_CACHE), 2) as PCT_FROM_CACHE,
+            STDDEV(PERCENTAGE_SCANNED_FROM_CACHE) as STDDEV_PCT_FROM_CACHE,
+            COUNT(*) as SAMPLED_QUERIES
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY {sample_clause(sample_rate)}
+        WHERE WAREHOUSE_NAME = '{warehouse}'
+            AND {utc_window('START_TIME', start, end)}
             AND BYTES_SCANNED > 0
         GROUP BY 1
         ORDER BY 1
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_spilling(_session, warehouse, start, end):
+    @dataset(ttl=3600)
+    def get_spilling(_session, warehouse, start, end, sample_rate=100):
         query = f"""
         SELECT 
             COUNT_IF(BYTES_SPILLED_TO_LOCAL_STORAGE > 0) as JOBS_SPILLED_LOCAL,
             COUNT_IF(BYTES_SPILLED_TO_REMOTE_STORAGE > 0) as JOBS_SPILLED_REMOTE,
             COUNT(*) as TOTAL_JOBS
-        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY {sample_clause(sample_rate)}
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
         """
-        return _session.sql(query).to_pandas()
+        return run_query(_session, query)
 
-    @st.cache_data(ttl=3600, show_spinner=False)
+    @dataset(ttl=3600)
     def get_errors(_session, warehouse, start, end):
         query = f"""
         SELECT 
@@ -179,97 +208,136 @@ if warehouse_list and selected_warehouse != "No warehouses found":
             COUNT(*) as ERROR_COUNT
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
         WHERE WAREHOUSE_NAME = '{warehouse}'
-            AND START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND {utc_window('START_TIME', start, end)}
             AND ERROR_CODE IS NOT NULL
         GROUP BY 1
         ORDER BY 2 DESC
         """
-        return _session.sql(query).to_pandas()
-
-    with st.spinner("Loading warehouse data..."):
-        daily_credits = get_daily_credits(session, selected_warehouse, start_date, end_date)
-        hourly_credits = get_hourly_credits(session, selected_warehouse, start_date, end_date)
-        events = get_warehouse_events(session, selected_warehouse, start_date, end_date)
-        size_history = get_warehouse_size_history(session, selected_warehouse, start_date, end_date)
-        cluster_usage = get_cluster_usage(session, selected_warehouse, start_date, end_date)
-        query_types = get_query_type_breakdown(session, selected_warehouse, start_date, end_date)
-        duration_breakdown = get_duration_breakdown(session, selected_warehouse, start_date, end_date)
-        cache_usage = get_cache_usage(session, selected_warehouse, start_date, end_date)
-        spilling = get_spilling(session, selected_warehouse, start_date, end_date)
-        errors = get_errors(session, selected_warehouse, start_date, end_date)
-
-    total_credits = daily_credits['CREDITS'].sum() if not daily_credits.empty else 0
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Credits", f"{total_credits:,.1f}")
-    with col2:
-        resume_count = len(events[events['EVENT_NAME'] == 'RESUME_WAREHOUSE']) if not events.empty else 0
-        st.metric("Resume Events", resume_count)
-    with col3:
-        avg_cache = cache_usage['PCT_FROM_CACHE'].mean() if not cache_usage.empty else 0
-        st.metric("Avg Cache Hit %", f"{avg_cache:.1f}%")
+        return run_query(_session, query)
 
-    st.markdown("---")
+    @dataset(ttl=3600)
+    def get_query_intervals(_session, warehouse, start, end):
+        query = f"""
+        SELECT 
+            (DATE_PART(EPOCH_MILLISECOND, START_TIME) + COMPILATION_TIME
+                + QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME + QUEUED_OVERLOAD_TIME) / 1000 as START_EPOCH,
+            EXECUTION_TIME / 1000 as EXECUTION_SECS,
+            WAREHOUSE_SIZE
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE WAREHOUSE_NAME = '{warehouse}'
+            AND {utc_window('START_TIME', start, end)}
+            AND EXECUTION_TIME > 0
+            AND WAREHOUSE_SIZE IS NOT NULL
+        """
+        return run_query(_session, query)
+
+    grain, scan_estimate = get_grain_plan(session, selected_warehouse, start_date, end_date)
+    if scan_estimate['over_budget']:
+        st.warning(
+            f"Estimated scan of {scan_estimate['bytes_assigned'] / 1024 ** 3:,.0f} GB "
+            f"({scan_estimate['partitions_assigned']:,} partitions) exceeds the scan budget - showing weekly credits "
+            "from the daily rollups only. Narrow the time period to load the query panels."
+        )
+    query_panels = not scan_estimate['over_budget']
+    time_format = '%b %d %H:%M' if grain == 'HOUR' else '%b %d'
+
+    time_window = selected_range(st.session_state.get("period_credits_chart"), "period", "USAGE_PERIOD")
+    selected_types = selected_values(st.session_state.get("query_types_chart"), "query_type", "QUERY_TYPE")
+
+    loader = ProgressiveLoader("Warehouse Analysis")
+    loader.fetch('daily_credits', load, session, 'daily_credits', start_date, end_date, {'WAREHOUSE_NAME': [selected_warehouse]})
+    loader.fetch('period_credits', get_period_credits, session, selected_warehouse, start_date, end_date, grain)
+    loader.fetch('events', get_warehouse_events, session, selected_warehouse, start_date, end_date)
+    if query_panels:
+        loader.fetch('size_history', get_warehouse_size_history, session, selected_warehouse, start_date, end_date, grain)
+        loader.fetch('cluster_usage', get_cluster_usage, session, selected_warehouse, start_date, end_date, grain)
+        loader.fetch('query_types', get_query_type_breakdown, session, selected_warehouse, start_date, end_date)
+        if selected_types:
+            loader.fetch('duration_breakdown', get_duration_breakdown_by_type, session, selected_warehouse, tuple(sorted(selected_types)), start_date, end_date, grain)
+        else:
+            loader.fetch('duration_breakdown', get_duration_breakdown, session, selected_warehouse, start_date, end_date, grain)
+        loader.fetch('cache_usage', get_cache_usage, session, selected_warehouse, start_date, end_date, grain, sample_rate)
+        loader.fetch('spilling', get_spilling, session, selected_warehouse, start_date, end_date, sample_rate)
+        loader.fetch('errors', get_errors, session, selected_warehouse, start_date, end_date)
+
+    def query_section(name, slot, needs, draw, height=80):
+        if query_panels:
+            loader.section(name, slot, needs, draw, height=height)
+        else:
+            slot.info("Skipped - narrow the time period to scan QUERY_HISTORY")
 
-    st.subheader("Daily Credits")
-    if not daily_credits.empty:
-        chart = alt.Chart(daily_credits).mark_area(
-            color='#29B5E8',
-            opacity=0.7,
-            line={'color': '#29B5E8'}
-        ).encode(
-            x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
-            y=alt.Y('CREDITS:Q', title='Credits')
-        ).properties(height=250)
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("No credit data")
-
-    st.subheader("Hourly Credits")
-    st.caption("Spot consumption spikes within the day")
-    if not hourly_credits.empty:
-        hourly_melted = hourly_credits.melt(id_vars=['USAGE_HOUR'], value_vars=['CREDITS', 'GS_CREDITS'], var_name='Type', value_name='Credits')
-        chart = alt.Chart(hourly_melted).mark_line(strokeWidth=2).encode(
-            x=alt.X('USAGE_HOUR:T', title='Time', axis=alt.Axis(format='%b %d %H:%M')),
-            y=alt.Y('Credits:Q', title='Credits'),
-            color=alt.Color('Type:N', scale=alt.Scale(domain=['CREDITS', 'GS_CREDITS'], range=['#29B5E8', '#1f84b3']))
-        ).properties(height=250)
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("No hourly data")
+    def windowed_cache_usage(cache_usage):
+        cache_usage = estimate(cache_usage, sample_rate, means={'PCT_FROM_CACHE': ('STDDEV_PCT_FROM_CACHE', 'SAMPLED_QUERIES')})
+        return filter_range(cache_usage, 'USAGE_PERIOD', time_window)
 
-    st.markdown("---")
+    def draw_total_credits(daily_credits):
+        total_credits = daily_credits['CREDITS'].sum() if not daily_credits.empty else 0
+        st.metric("Total Credits", f"{total_credits:,.1f}")
 
-    st.subheader("Suspend/Resume Timeline")
-    st.caption("Is the warehouse suspending properly or left running?")
-    if not events.empty:
-        events['EVENT_COLOR'] = events['EVENT_NAME'].map({
-            'RESUME_WAREHOUSE': 'Resume',
-            'SUSPEND_WAREHOUSE': 'Suspend'
-        })
-        chart = alt.Chart(events).mark_circle(size=100).encode(
-            x=alt.X('TIMESTAMP:T', title='Time', axis=alt.Axis(format='%b %d %H:%M')),
-            y=alt.Y('EVENT_COLOR:N', title=''),
-            color=alt.Color('EVENT_COLOR:N', 
-                scale=alt.Scale(domain=['Resume', 'Suspend'], range=['#29B5E8', '#71D3DC']),
-                legend=alt.Legend(title='Event')
-            ),
-            tooltip=['TIMESTAMP:T', 'EVENT_NAME:N', 'CLUSTER_NUMBER:Q']
-        ).properties(height=150)
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("No events found - warehouse may be running 24x7 or no activity")
+    def draw_resume_events(events):
+        resume_count = len(events[events['EVENT_NAME'] == 'RESUME_WAREHOUSE']) if not events.empty else 0
+        st.metric("Resume Events", resume_count)
 
-    st.markdown("---")
+    def draw_cache_kpi(cache_usage):
+        cache_usage = windowed_cache_usage(cache_usage)
+        if approximate and not cache_usage.empty:
+            avg_cache, low, high = mean_of_means_interval(cache_usage['PCT_FROM_CACHE'], cache_usage['PCT_FROM_CACHE_LOW'], cache_usage['PCT_FROM_CACHE_HIGH'])
+            st.metric("Avg Cache Hit %", f"{avg_cache:.1f}% ± {(high - low) / 2:.1f}", help=f"95% CI from a {sample_rate}% sample")
+        else:
+            avg_cache = cache_usage['PCT_FROM_CACHE'].mean() if not cache_usage.empty else 0
+            st.metric("Avg Cache Hit %", f"{avg_cache:.1f}%")
+
+    def draw_daily_credits(daily_credits):
+        if not daily_credits.empty:
+            chart = alt.Chart(daily_credits).mark_area(
+                color='#29B5E8',
+                opacity=0.7,
+                line={'color': '#29B5E8'}
+            ).encode(
+                x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
+                y=alt.Y('CREDITS:Q', title='Credits')
+            ).properties(height=250)
+            st.altair_chart(chart, use_container_width=True)
+        else:
+            st.info("No credit data")
+
+    def draw_period_credits(period_credits):
+        if not period_credits.empty:
+            period_melted = period_credits.melt(id_vars=['USAGE_PERIOD'], value_vars=['CREDITS', 'GS_CREDITS'], var_name='Type', value_name='Credits')
+            period_brush = alt.selection_interval(encodings=['x'], name='period')
+            chart = alt.Chart(period_melted).mark_line(strokeWidth=2).encode(
+                x=alt.X('USAGE_PERIOD:T', title='Time (UTC)', scale=UTC_SCALE, axis=alt.Axis(format=time_format)),
+                y=alt.Y('Credits:Q', title='Credits'),
+                color=alt.Color('Type:N', scale=alt.Scale(domain=['CREDITS', 'GS_CREDITS'], range=['#29B5E8', '#1f84b3']))
+            ).add_params(period_brush).properties(height=250)
+            st.altair_chart(chart, use_container_width=True, on_select="rerun", key="period_credits_chart")
+        else:
+            st.info("No credit data")
 
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("Warehouse Size Over Time")
-        st.caption("Size changes can cause credit spikes")
+    def draw_events(events):
+        if not events.empty:
+            events['EVENT_COLOR'] = events['EVENT_NAME'].map({
+                'RESUME_WAREHOUSE': 'Resume',
+                'SUSPEND_WAREHOUSE': 'Suspend'
+            })
+            chart = alt.Chart(events).mark_circle(size=100).encode(
+                x=alt.X('TIMESTAMP:T', title='Time', axis=alt.Axis(format='%b %d %H:%M')),
+                y=alt.Y('EVENT_COLOR:N', title=''),
+                color=alt.Color('EVENT_COLOR:N', 
+                    scale=alt.Scale(domain=['Resume', 'Suspend'], range=['#29B5E8', '#71D3DC']),
+                    legend=alt.Legend(title='Event')
+                ),
+                tooltip=['TIMESTAMP:T', 'EVENT_NAME:N', 'CLUSTER_NUMBER:Q']
+            ).properties(height=150)
+            st.altair_chart(chart, use_container_width=True)
+        else:
+            st.info("No events found - warehouse may be running 24x7 or no activity")
+
+    def draw_size_history(size_history):
+        size_history = filter_range(size_history, 'USAGE_PERIOD', time_window)
         if not size_history.empty:
             chart = alt.Chart(size_history).mark_bar().encode(
-                x=alt.X('USAGE_HOUR:T', title='Time'),
+                x=alt.X('USAGE_PERIOD:T', title='Time (UTC)', scale=UTC_SCALE),
                 y=alt.Y('QUERY_COUNT:Q', title='Query Count'),
                 color=alt.Color('WAREHOUSE_SIZE:N', title='Size')
             ).properties(height=250)
@@ -277,13 +345,12 @@ if warehouse_list and selected_warehouse != "No warehouses found":
         else:
             st.info("No size data")
 
-    with col2:
-        st.subheader("Cluster Usage")
-        st.caption("Multi-cluster behavior (higher = more scaling)")
+    def draw_cluster_usage(cluster_usage):
+        cluster_usage = filter_range(cluster_usage, 'USAGE_PERIOD', time_window)
         if not cluster_usage.empty:
             cluster_usage['CLUSTER_NUMBER'] = cluster_usage['CLUSTER_NUMBER'].astype(str)
             chart = alt.Chart(cluster_usage).mark_bar().encode(
-                x=alt.X('USAGE_HOUR:T', title='Time'),
+                x=alt.X('USAGE_PERIOD:T', title='Time (UTC)', scale=UTC_SCALE),
                 y=alt.Y('QUERY_COUNT:Q', title='Query Count'),
                 color=alt.Color('CLUSTER_NUMBER:N', title='Cluster')
             ).properties(height=250)
@@ -291,93 +358,222 @@ if warehouse_list and selected_warehouse != "No warehouses found":
         else:
             st.info("No cluster data")
 
-    st.markdown("---")
-
-    st.subheader("Query Type Breakdown")
-    st.caption("What is the warehouse doing?")
-    if not query_types.empty:
-        chart = alt.Chart(query_types.head(10)).mark_bar(color='#29B5E8').encode(
-            x=alt.X('QUERY_COUNT:Q', title='Query Count'),
-            y=alt.Y('QUERY_TYPE:N', title='', sort='-x')
-        ).properties(height=300)
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("No query type data")
-
-    st.markdown("---")
-
-    st.subheader("Query Duration Breakdown")
-    st.caption("Where is time being spent? (Compile vs Queue vs Execute)")
-    if not duration_breakdown.empty:
-        duration_melted = duration_breakdown.melt(
-            id_vars=['USAGE_HOUR'], 
-            value_vars=['AVG_COMPILE_SECS', 'AVG_QUEUE_SECS', 'AVG_EXEC_SECS'], 
-            var_name='Phase', 
-            value_name='Seconds'
-        )
-        duration_melted['Phase'] = duration_melted['Phase'].map({
-            'AVG_COMPILE_SECS': 'Compile',
-            'AVG_QUEUE_SECS': 'Queue',
-            'AVG_EXEC_SECS': 'Execute'
-        })
-        chart = alt.Chart(duration_melted).mark_area(opacity=0.7).encode(
-            x=alt.X('USAGE_HOUR:T', title='Time'),
-            y=alt.Y('Seconds:Q', title='Avg Seconds', stack='zero'),
-            color=alt.Color('Phase:N', scale=alt.Scale(domain=['Compile', 'Queue', 'Execute'], range=['#71D3DC', '#1f84b3', '#29B5E8']))
-        ).properties(height=250)
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("No duration data")
-
-    st.markdown("---")
-
-    col1, col2 = st.columns(2)
+    def draw_query_types(query_types):
+        if not query_types.empty:
+            type_select = alt.selection_point(fields=['QUERY_TYPE'], name='query_type')
+            chart = alt.Chart(query_types.head(10)).mark_bar().encode(
+                x=alt.X('QUERY_COUNT:Q', title='Query Count'),
+                y=alt.Y('QUERY_TYPE:N', title='', sort='-x'),
+                color=highlight(type_select)
+            ).add_params(type_select).properties(height=300)
+            st.altair_chart(chart, use_container_width=True, on_select="rerun", key="query_types_chart")
+        else:
+            st.info("No query type data")
+
+    def draw_duration_breakdown(duration_breakdown):
+        duration_breakdown = filter_range(duration_breakdown, 'USAGE_PERIOD', time_window)
+        if not duration_breakdown.empty:
+            duration_melted = duration_breakdown.melt(
+                id_vars=['USAGE_PERIOD'], 
+                value_vars=['AVG_COMPILE_SECS', 'AVG_QUEUE_SECS', 'AVG_EXEC_SECS'], 
+                var_name='Phase', 
+                value_name='Seconds'
+            )
+            duration_melted['Phase'] = duration_melted['Phase'].map({
+                'AVG_COMPILE_SECS': 'Compile',
+                'AVG_QUEUE_SECS': 'Queue',
+                'AVG_EXEC_SECS': 'Execute'
+            })
+            chart = alt.Chart(duration_melted).mark_area(opacity=0.7).encode(
+                x=alt.X('USAGE_PERIOD:T', title='Time (UTC)', scale=UTC_SCALE),
+                y=alt.Y('Seconds:Q', title='Avg Seconds', stack='zero'),
+                color=alt.Color('Phase:N', scale=alt.Scale(domain=['Compile', 'Queue', 'Execute'], range=['#71D3DC', '#1f84b3', '#29B5E8']))
+            ).properties(height=250)
+            st.altair_chart(chart, use_container_width=True)
+        else:
+            st.info("No duration data")
 
-    with col1:
-        st.subheader("Cache Hit Ratio")
-        st.caption("Higher = better (reading from cache vs remote storage)")
+    def draw_cache_usage(cache_usage):
+        cache_usage = windowed_cache_usage(cache_usage)
         if not cache_usage.empty:
             chart = alt.Chart(cache_usage).mark_line(color='#29B5E8', strokeWidth=2).encode(
-                x=alt.X('USAGE_HOUR:T', title='Time'),
+                x=alt.X('USAGE_PERIOD:T', title='Time (UTC)', scale=UTC_SCALE),
                 y=alt.Y('PCT_FROM_CACHE:Q', title='% from Cache', scale=alt.Scale(domain=[0, 100]))
-            ).properties(height=200)
+            )
+            if approximate:
+                band = alt.Chart(cache_usage).mark_area(color='#29B5E8', opacity=0.2).encode(
+                    x=alt.X('USAGE_PERIOD:T', scale=UTC_SCALE),
+                    y='PCT_FROM_CACHE_LOW:Q',
+                    y2='PCT_FROM_CACHE_HIGH:Q'
+                )
+                chart = band + chart
+            chart = chart.properties(height=200)
             st.altair_chart(chart, use_container_width=True)
         else:
             st.info("No cache data")
 
-    with col2:
-        st.subheader("Data Spilling")
-        st.caption("Spilling = memory pressure, consider larger warehouse")
+    def draw_spilling(spilling):
         if not spilling.empty:
             total_jobs = spilling['TOTAL_JOBS'].iloc[0]
-            local_pct = (spilling['JOBS_SPILLED_LOCAL'].iloc[0] / total_jobs * 100) if total_jobs > 0 else 0
-            remote_pct = (spilling['JOBS_SPILLED_REMOTE'].iloc[0] / total_jobs * 100) if total_jobs > 0 else 0
+            local = [v * 100 for v in proportion_interval(spilling['JOBS_SPILLED_LOCAL'].iloc[0], total_jobs)]
+            remote = [v * 100 for v in proportion_interval(spilling['JOBS_SPILLED_REMOTE'].iloc[0], total_jobs)]
             
             spill_df = pd.DataFrame({
                 'Type': ['Spilling Locally', 'Spilling Remotely'],
-                'Percentage': [local_pct, remote_pct]
+                'Percentage': [local[0], remote[0]],
+                'Percentage_LOW': [local[1], remote[1]],
+                'Percentage_HIGH': [local[2], remote[2]]
             })
             chart = alt.Chart(spill_df).mark_bar().encode(
                 x=alt.X('Percentage:Q', title='% of Jobs', scale=alt.Scale(domain=[0, 100])),
                 y=alt.Y('Type:N', title=''),
                 color=alt.Color('Type:N', scale=alt.Scale(domain=['Spilling Locally', 'Spilling Remotely'], range=['#1f84b3', '#71D3DC']), legend=None)
-            ).properties(height=100)
+            )
+            if approximate:
+                chart = chart + error_bars(spill_df, 'Percentage', 'Type', None)
+            chart = chart.properties(height=100)
             st.altair_chart(chart, use_container_width=True)
         else:
             st.info("No spilling data")
 
+    def draw_errors(errors):
+        if not errors.empty:
+            chart = alt.Chart(errors).mark_bar(color='#E74C3C').encode(
+                x=alt.X('ERROR_COUNT:Q', title='Error Count'),
+                y=alt.Y('ERROR_CATEGORY:N', title='', sort='-x')
+            ).properties(height=200)
+            st.altair_chart(chart, use_container_width=True)
+        else:
+            st.success("No errors found!")
+
+    col1, col2, col3 = st.columns(3)
+    loader.section("Total Credits", col1.empty(), ['daily_credits'], draw_total_credits)
+    loader.section("Resume Events", col2.empty(), ['events'], draw_resume_events)
+    query_section("Avg Cache Hit %", col3.empty(), ['cache_usage'], draw_cache_kpi)
+
+    st.markdown("---")
+
+    st.subheader("Daily Credits")
+    loader.section("Daily Credits", st.empty(), ['daily_credits'], draw_daily_credits, height=250)
+
+    st.subheader(f"Credits per {GRAIN_LABELS[grain]}")
+    st.caption("Spot consumption spikes - drag to filter the charts below to a time window")
+    loader.section("Period Credits", st.empty(), ['period_credits'], draw_period_credits, height=250)
+
+    st.markdown("---")
+
+    st.subheader("Suspend/Resume Timeline")
+    st.caption("Is the warehouse suspending properly or left running?")
+    loader.section("Suspend/Resume Timeline", st.empty(), ['events'], draw_events, height=150)
+
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Warehouse Size Over Time")
+        st.caption("Size changes can cause credit spikes")
+        query_section("Warehouse Size Over Time", st.empty(), ['size_history'], draw_size_history, height=250)
+
+    with col2:
+        st.subheader("Cluster Usage")
+        st.caption("Multi-cluster behavior (higher = more scaling)")
+        query_section("Cluster Usage", st.empty(), ['cluster_usage'], draw_cluster_usage, height=250)
+
+    st.markdown("---")
+
+    st.subheader("Query Type Breakdown")
+    st.caption("What is the warehouse doing? Click a bar to break down duration by query type")
+    query_section("Query Type Breakdown", st.empty(), ['query_types'], draw_query_types, height=300)
+
+    st.markdown("---")
+
+    st.subheader("Query Duration Breakdown")
+    st.caption("Where is time being spent? (Compile vs Queue vs Execute)")
+    if selected_types:
+        st.caption(f"Query types: {', '.join(selected_types)}")
+    query_section("Query Duration Breakdown", st.empty(), ['duration_breakdown'], draw_duration_breakdown, height=250)
+
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Cache Hit Ratio")
+        st.caption("Higher = better (reading from cache vs remote storage)")
+        query_section("Cache Hit Ratio", st.empty(), ['cache_usage'], draw_cache_usage, height=200)
+
+    with col2:
+        st.subheader("Data Spilling")
+        st.caption("Spilling = memory pressure, consider larger warehouse")
+        query_section("Data Spilling", st.empty(), ['spilling'], draw_spilling, height=100)
+
     st.markdown("---")
 
     st.subheader("Errors by Category")
     st.caption("Timeouts, cancellations, compilation errors")
-    if not errors.empty:
-        chart = alt.Chart(errors).mark_bar(color='#E74C3C').encode(
-            x=alt.X('ERROR_COUNT:Q', title='Error Count'),
-            y=alt.Y('ERROR_CATEGORY:N', title='', sort='-x')
-        ).properties(height=200)
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.success("No errors found!")
+    query_section("Errors by Category", st.empty(), ['errors'], draw_errors, height=200)
+
+    results = loader.run()
+    show_timings("Warehouse Analysis")
+
+    st.markdown("---")
+
+    st.subheader("What-if Simulator")
+    st.caption("Replay this warehouse's queries against other auto-suspend, size and multi-cluster settings")
+    sim_days = min(days_back, 30)
+    sim_start = end_date - timedelta(days=sim_days)
+    with st.form("simulator"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sim_suspends = st.multiselect("Auto-suspend (seconds)", [60, 120, 300, 600, 1800, 3600], default=[60, 300, 600])
+        with col2:
+            size_history = results.get('size_history', pd.DataFrame())
+            current_size = size_history['WAREHOUSE_SIZE'].mode().iloc[0] if not size_history.empty else 'X-Small'
+            size_options = list(CREDITS_PER_HOUR)
+            current_index = size_options.index(current_size) if current_size in size_options else 0
+            sim_sizes = st.multiselect("Sizes", size_options, default=size_options[max(current_index - 1, 0):current_index + 2])
+        with col3:
+            sim_max_clusters = st.multiselect("Max clusters", [1, 2, 3, 4, 6, 8, 10], default=[1])
+            sim_min_clusters = st.number_input("Min clusters", 1, 10, 1)
+        run_simulation = st.form_submit_button(f"Simulate last {sim_days} days")
+
+    if run_simulation:
+        cluster_ranges = [(sim_min_clusters, m) for m in sim_max_clusters if m >= sim_min_clusters]
+        if not (sim_suspends and sim_sizes and cluster_ranges):
+            st.warning("Pick at least one auto-suspend value, size and max cluster count")
+        else:
+            with st.spinner("Loading query intervals..."):
+                intervals = get_query_intervals(session, selected_warehouse, sim_start, end_date)
+            with st.spinner(f"Replaying {len(intervals):,} queries..."):
+                simulation = simulate(intervals, sim_suspends, sim_sizes, cluster_ranges)
+            if simulation.empty:
+                st.info("No queries to replay")
+            else:
+                daily_credits = results['daily_credits']
+                actual = daily_credits[pd.to_datetime(daily_credits['USAGE_DATE']) >= pd.Timestamp(sim_start)]['CREDITS'].sum() if not daily_credits.empty else 0
+                best = simulation.sort_values(['QUEUED_QUERY_HOURS', 'CREDITS']).iloc[0]
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Metered Credits", f"{actual:,.1f}")
+                with col2:
+                    st.metric("Cheapest With Least Queueing", f"{best['CREDITS']:,.1f}", help=f"{best['WAREHOUSE_SIZE']}, {best['AUTO_SUSPEND']}s auto-suspend, {best['MIN_CLUSTERS']}-{best['MAX_CLUSTERS']} clusters")
+                with col3:
+                    st.metric("Configurations", len(simulation))
+                simulation['CLUSTERS'] = simulation['MIN_CLUSTERS'].astype(str) + '-' + simulation['MAX_CLUSTERS'].astype(str)
+                chart = alt.Chart(simulation).mark_line(point=True).encode(
+                    x=alt.X('AUTO_SUSPEND:Q', title='Auto-suspend (seconds)'),
+                    y=alt.Y('CREDITS:Q', title='Projected Credits'),
+                    color=alt.Color('WAREHOUSE_SIZE:N', title='Size', sort=size_options),
+                    strokeDash=alt.StrokeDash('CLUSTERS:N', title='Clusters'),
+                    tooltip=['WAREHOUSE_SIZE:N', 'AUTO_SUSPEND:Q', 'CLUSTERS:N', alt.Tooltip('CREDITS:Q', format=',.1f'), 'RESUMES:Q', alt.Tooltip('QUEUED_QUERY_HOURS:Q', format=',.2f')]
+                ).properties(height=300)
+                st.altair_chart(chart, use_container_width=True)
+                st.dataframe(
+                    simulation[['WAREHOUSE_SIZE', 'AUTO_SUSPEND', 'MIN_CLUSTERS', 'MAX_CLUSTERS', 'CREDITS', 'RESUMES', 'QUEUED_QUERY_HOURS', 'PEAK_CONCURRENCY']].sort_values('CREDITS'),
+                    use_container_width=True
+                )
+                st.caption("Assumes execution time scales inversely with size, 8 concurrent queries per cluster, and 60-second minimum billing per resume")
 
 else:
     st.warning("No warehouses found for the selected period")
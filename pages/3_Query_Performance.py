@@ -1,50 +1,33 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from snowflake.snowpark.context import get_active_session
+from snowflake.snowpark.exceptions import SnowparkSQLException
 from datetime import datetime, timedelta
+from common.accounts import account_session
+from common.selection import selected_values, filter_values, highlight
+from common.cache import dataset
+from common.sampling import SAMPLE_RATES, sample_clause, estimate, error_bars
+from common.execution import begin_run, run_query
+from common.registry import load
+from common.progressive import ProgressiveLoader, show_timings
 
-session = get_active_session()
+session = account_session()
+begin_run()
 
 st.title("Query Performance")
 
-days_back = st.selectbox("Time Period", [7, 14, 30], index=0, format_func=lambda x: f"Last {x} days")
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    days_back = st.selectbox("Time Period", [7, 14, 30], index=0, format_func=lambda x: f"Last {x} days")
+with col2:
+    approximate = st.toggle("Approximate (sampled)", help="Aggregate a random sample of QUERY_HISTORY rows and show 95% confidence intervals")
+with col3:
+    sample_rate = st.select_slider("Sample rate %", SAMPLE_RATES, value=10) if approximate else 100
 
 end_date = datetime.now().date()
 start_date = end_date - timedelta(days=days_back)
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_query_metrics(_session, start, end):
-    query = f"""
-    SELECT 
-        COUNT(*) as TOTAL_QUERIES,
-        COUNT_IF(EXECUTION_STATUS = 'SUCCESS') as SUCCESSFUL,
-        COUNT_IF(EXECUTION_STATUS != 'SUCCESS') as FAILED,
-        ROUND(AVG(TOTAL_ELAPSED_TIME) / 1000, 2) as AVG_DURATION_SECS,
-        ROUND(MEDIAN(TOTAL_ELAPSED_TIME) / 1000, 2) as MEDIAN_DURATION_SECS,
-        ROUND(MAX(TOTAL_ELAPSED_TIME) / 1000, 2) as MAX_DURATION_SECS,
-        ROUND(SUM(BYTES_SCANNED) / POWER(1024, 4), 2) as TB_SCANNED
-    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_daily_query_volume(_session, start, end):
-    query = f"""
-    SELECT 
-        DATE_TRUNC('DAY', START_TIME)::DATE as QUERY_DATE,
-        COUNT(*) as QUERY_COUNT,
-        COUNT_IF(EXECUTION_STATUS = 'SUCCESS') as SUCCESS_COUNT,
-        COUNT_IF(EXECUTION_STATUS != 'SUCCESS') as FAILED_COUNT
-    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
-    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
-    GROUP BY 1
-    ORDER BY 1
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
+@dataset(ttl=3600)
 def get_expensive_queries(_session, start, end):
     query = f"""
     SELECT 
@@ -62,9 +45,9 @@ def get_expensive_queries(_session, start, end):
     ORDER BY BYTES_SCANNED DESC
     LIMIT 20
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@dataset(ttl=3600)
 def get_slow_queries(_session, start, end, threshold_secs):
     query = f"""
     SELECT 
@@ -83,9 +66,9 @@ def get_slow_queries(_session, start, end, threshold_secs):
     ORDER BY TOTAL_ELAPSED_TIME DESC
     LIMIT 20
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@dataset(ttl=3600)
 def get_failed_queries(_session, start, end):
     query = f"""
     SELECT 
@@ -108,44 +91,151 @@ def get_failed_queries(_session, start, end):
     ORDER BY START_TIME DESC
     LIMIT 50
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_query_by_type(_session, start, end):
+@dataset(ttl=3600)
+def get_query_by_type(_session, start, end, sample_rate=100):
     query = f"""
     SELECT 
         QUERY_TYPE,
         COUNT(*) as QUERY_COUNT,
         ROUND(AVG(TOTAL_ELAPSED_TIME) / 1000, 2) as AVG_DURATION_SECS,
-        ROUND(SUM(BYTES_SCANNED) / POWER(1024, 3), 2) as TOTAL_GB_SCANNED
-    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        ROUND(SUM(BYTES_SCANNED) / POWER(1024, 3), 2) as TOTAL_GB_SCANNED,
+        STDDEV(TOTAL_ELAPSED_TIME) / 1000 as STDDEV_DURATION_SECS,
+        SUM(SQUARE(BYTES_SCANNED / POWER(1024, 3))) as SUM_SQ_GB_SCANNED
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY {sample_clause(sample_rate)}
+    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
+    GROUP BY 1
+    ORDER BY 2 DESC
+    """
+    return run_query(_session, query)
+
+@dataset(ttl=3600)
+def get_query_by_type_for_warehouses(_session, start, end, warehouses, sample_rate=100):
+    warehouse_filter = " OR ".join(
+        "WAREHOUSE_NAME IS NULL" if w == 'Cloud Services' else f"WAREHOUSE_NAME = '{w}'" for w in warehouses
+    )
+    query = f"""
+    SELECT 
+        QUERY_TYPE,
+        COUNT(*) as QUERY_COUNT,
+        ROUND(AVG(TOTAL_ELAPSED_TIME) / 1000, 2) as AVG_DURATION_SECS,
+        ROUND(SUM(BYTES_SCANNED) / POWER(1024, 3), 2) as TOTAL_GB_SCANNED,
+        STDDEV(TOTAL_ELAPSED_TIME) / 1000 as STDDEV_DURATION_SECS,
+        SUM(SQUARE(BYTES_SCANNED / POWER(1024, 3))) as SUM_SQ_GB_SCANNED
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY {sample_clause(sample_rate)}
     WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
+        AND ({warehouse_filter})
     GROUP BY 1
     ORDER BY 2 DESC
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_query_by_warehouse(_session, start, end):
+@dataset(ttl=3600)
+def get_query_by_warehouse(_session, start, end, sample_rate=100):
     query = f"""
     SELECT 
         COALESCE(WAREHOUSE_NAME, 'Cloud Services') as WAREHOUSE_NAME,
         COUNT(*) as QUERY_COUNT,
-        ROUND(AVG(TOTAL_ELAPSED_TIME) / 1000, 2) as AVG_DURATION_SECS
-    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        ROUND(AVG(TOTAL_ELAPSED_TIME) / 1000, 2) as AVG_DURATION_SECS,
+        STDDEV(TOTAL_ELAPSED_TIME) / 1000 as STDDEV_DURATION_SECS
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY {sample_clause(sample_rate)}
     WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
     GROUP BY 1
     ORDER BY 2 DESC
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
+
+@dataset(ttl=3600, max_entries=32)
+def get_query_detail(_session, query_id, start, end):
+    query = f"""
+    SELECT 
+        QUERY_ID,
+        START_TIME,
+        DATABASE_NAME,
+        SCHEMA_NAME,
+        ROLE_NAME,
+        QUERY_TAG,
+        EXECUTION_STATUS,
+        ROUND(PARTITIONS_SCANNED / NULLIF(PARTITIONS_TOTAL, 0) * 100, 1) as PCT_PARTITIONS_SCANNED,
+        ROUND(BYTES_SPILLED_TO_LOCAL_STORAGE / POWER(1024, 3), 2) as GB_SPILLED_LOCAL,
+        ROUND(BYTES_SPILLED_TO_REMOTE_STORAGE / POWER(1024, 3), 2) as GB_SPILLED_REMOTE,
+        QUERY_TEXT,
+        ERROR_MESSAGE
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+    WHERE QUERY_ID = '{query_id}'
+        AND START_TIME >= '{start}' AND START_TIME < '{end}'
+    """
+    return run_query(_session, query)
+
+@dataset(ttl=3600, max_entries=32)
+def get_operator_stats(_session, query_id):
+    query = f"""
+    SELECT 
+        OPERATOR_ID,
+        OPERATOR_TYPE,
+        PARENT_OPERATORS::STRING as PARENT_OPERATORS,
+        ROUND(EXECUTION_TIME_BREAKDOWN:overall_percentage::FLOAT * 100, 1) as PCT_OF_TIME,
+        OPERATOR_STATISTICS:output_rows::NUMBER as OUTPUT_ROWS,
+        OPERATOR_STATISTICS:pruning:partitions_scanned::NUMBER as PARTITIONS_SCANNED,
+        OPERATOR_STATISTICS:pruning:partitions_total::NUMBER as PARTITIONS_TOTAL,
+        ROUND(OPERATOR_STATISTICS:spilling:bytes_spilled_local_storage::NUMBER / POWER(1024, 3), 2) as GB_SPILLED_LOCAL,
+        OPERATOR_ATTRIBUTES:table_name::STRING as TABLE_NAME
+    FROM TABLE(GET_QUERY_OPERATOR_STATS('{query_id}'))
+    ORDER BY PCT_OF_TIME DESC NULLS LAST
+    """
+    return run_query(_session, query)
 
-with st.spinner("Loading query metrics..."):
-    metrics = get_query_metrics(session, start_date, end_date)
-    daily_volume = get_daily_query_volume(session, start_date, end_date)
-    by_type = get_query_by_type(session, start_date, end_date)
-    by_warehouse = get_query_by_warehouse(session, start_date, end_date)
+def show_query_detail(table, selection):
+    rows = selection.selection.rows if selection else []
+    if not rows or rows[0] >= len(table):
+        st.caption("Select a row to load the full query text and operator profile")
+        return
+    query_id = table['QUERY_ID'].iloc[rows[0]]
+    with st.spinner(f"Loading query {query_id}..."):
+        detail = get_query_detail(session, query_id, start_date, end_date)
+    if detail.empty:
+        st.info("Query not found in ACCOUNT_USAGE")
+        return
+    row = detail.iloc[0]
+    st.markdown(f"**{query_id}** · {row['EXECUTION_STATUS']} · role {row['ROLE_NAME']} · {row['DATABASE_NAME']}.{row['SCHEMA_NAME']}")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Partitions Scanned", f"{row['PCT_PARTITIONS_SCANNED']:.1f}%" if pd.notna(row['PCT_PARTITIONS_SCANNED']) else "n/a")
+    with col2:
+        st.metric("Spilled Locally", f"{row['GB_SPILLED_LOCAL']:.2f} GB")
+    with col3:
+        st.metric("Spilled Remotely", f"{row['GB_SPILLED_REMOTE']:.2f} GB")
+    st.code(row['QUERY_TEXT'], language="sql")
+    if pd.notna(row['ERROR_MESSAGE']):
+        st.error(row['ERROR_MESSAGE'])
+    try:
+        operators = get_operator_stats(session, query_id)
+    except SnowparkSQLException:
+        st.info("Operator statistics are only available for queries from the last 14 days that you have access to")
+        return
+    if not operators.empty:
+        st.caption("Operator profile")
+        st.dataframe(operators, use_container_width=True)
+
+selected_types = selected_values(st.session_state.get("by_type_chart"), "query_type", "QUERY_TYPE")
+selected_warehouses = selected_values(st.session_state.get("by_warehouse_chart"), "warehouse", "WAREHOUSE_NAME")
+duration_interval = {'AVG_DURATION_SECS': ('STDDEV_DURATION_SECS', 'QUERY_COUNT')}
+
+loader = ProgressiveLoader("Query Performance")
+loader.fetch('metrics', load, session, 'query_summary', start_date, end_date)
+loader.fetch('daily_volume', load, session, 'daily_query_volume', start_date, end_date)
+if selected_warehouses:
+    loader.fetch('by_type', get_query_by_type_for_warehouses, session, start_date, end_date, tuple(sorted(selected_warehouses)), sample_rate)
+else:
+    loader.fetch('by_type', get_query_by_type, session, start_date, end_date, sample_rate)
+loader.fetch('by_warehouse', get_query_by_warehouse, session, start_date, end_date, sample_rate)
+loader.fetch('expensive', get_expensive_queries, session, start_date, end_date)
+loader.fetch('failed', get_failed_queries, session, start_date, end_date)
 
-if not metrics.empty:
+def draw_kpis(metrics):
+    if metrics.empty:
+        return
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Queries", f"{metrics['TOTAL_QUERIES'].iloc[0]:,}")
@@ -157,72 +247,71 @@ if not metrics.empty:
     with col4:
         st.metric("Data Scanned", f"{metrics['TB_SCANNED'].iloc[0]:.2f} TB")
 
-st.markdown("---")
-
-st.subheader("Daily Query Volume")
-if not daily_volume.empty:
-    volume_melted = daily_volume.melt(id_vars=['QUERY_DATE'], value_vars=['SUCCESS_COUNT', 'FAILED_COUNT'], var_name='Status', value_name='Count')
-    volume_melted['Status'] = volume_melted['Status'].map({'SUCCESS_COUNT': 'Success', 'FAILED_COUNT': 'Failed'})
-    chart = alt.Chart(volume_melted).mark_line(strokeWidth=2).encode(
-        x=alt.X('QUERY_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
-        y=alt.Y('Count:Q', title='Query Count'),
-        color=alt.Color('Status:N', scale=alt.Scale(domain=['Success', 'Failed'], range=['#29B5E8', '#E74C3C']))
-    ).properties(height=250)
-    st.altair_chart(chart, use_container_width=True)
-else:
-    st.info("No query data")
-
-st.markdown("---")
-
-col1, col2 = st.columns(2)
+def draw_daily_volume(daily_volume):
+    if not daily_volume.empty:
+        volume_melted = daily_volume.melt(id_vars=['USAGE_DATE'], value_vars=['SUCCESSFUL', 'FAILED'], var_name='Status', value_name='Count')
+        volume_melted['Status'] = volume_melted['Status'].map({'SUCCESSFUL': 'Success', 'FAILED': 'Failed'})
+        chart = alt.Chart(volume_melted).mark_line(strokeWidth=2).encode(
+            x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
+            y=alt.Y('Count:Q', title='Query Count'),
+            color=alt.Color('Status:N', scale=alt.Scale(domain=['Success', 'Failed'], range=['#29B5E8', '#E74C3C']))
+        ).properties(height=250)
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.info("No query data")
 
-with col1:
-    st.subheader("By Query Type")
+def draw_by_type(by_type):
+    by_type = estimate(by_type, sample_rate, counts=['QUERY_COUNT'], sums={'TOTAL_GB_SCANNED': 'SUM_SQ_GB_SCANNED'}, means=duration_interval)
     if not by_type.empty:
-        chart = alt.Chart(by_type.head(10)).mark_bar(color='#29B5E8').encode(
+        type_select = alt.selection_point(fields=['QUERY_TYPE'], name='query_type')
+        top_types = by_type.head(10)
+        chart = alt.Chart(top_types).mark_bar().encode(
             x=alt.X('QUERY_COUNT:Q', title='Query Count'),
-            y=alt.Y('QUERY_TYPE:N', title='', sort='-x')
-        ).properties(height=300)
-        st.altair_chart(chart, use_container_width=True)
+            y=alt.Y('QUERY_TYPE:N', title='', sort=top_types['QUERY_TYPE'].tolist()),
+            color=highlight(type_select)
+        ).add_params(type_select)
+        if approximate:
+            chart = chart + error_bars(top_types, 'QUERY_COUNT', 'QUERY_TYPE', top_types['QUERY_TYPE'].tolist())
+        chart = chart.properties(height=300)
+        st.altair_chart(chart, use_container_width=True, on_select="rerun", key="by_type_chart")
     else:
         st.info("No data")
 
-with col2:
-    st.subheader("By Warehouse")
+def draw_by_warehouse(by_warehouse):
+    by_warehouse = estimate(by_warehouse, sample_rate, counts=['QUERY_COUNT'], means=duration_interval)
     if not by_warehouse.empty:
-        chart = alt.Chart(by_warehouse.head(10)).mark_bar(color='#29B5E8').encode(
+        warehouse_select = alt.selection_point(fields=['WAREHOUSE_NAME'], name='warehouse')
+        top_warehouses = by_warehouse.head(10)
+        chart = alt.Chart(top_warehouses).mark_bar().encode(
             x=alt.X('QUERY_COUNT:Q', title='Query Count'),
-            y=alt.Y('WAREHOUSE_NAME:N', title='', sort='-x')
-        ).properties(height=300)
-        st.altair_chart(chart, use_container_width=True)
+            y=alt.Y('WAREHOUSE_NAME:N', title='', sort=top_warehouses['WAREHOUSE_NAME'].tolist()),
+            color=highlight(warehouse_select)
+        ).add_params(warehouse_select)
+        if approximate:
+            chart = chart + error_bars(top_warehouses, 'QUERY_COUNT', 'WAREHOUSE_NAME', top_warehouses['WAREHOUSE_NAME'].tolist())
+        chart = chart.properties(height=300)
+        st.altair_chart(chart, use_container_width=True, on_select="rerun", key="by_warehouse_chart")
     else:
         st.info("No data")
 
-st.markdown("---")
-
-tab1, tab2, tab3 = st.tabs(["Expensive Queries", "Slow Queries", "Failed Queries"])
-
-with tab1:
-    st.caption("Top queries by data scanned")
-    with st.spinner("Loading expensive queries..."):
-        expensive = get_expensive_queries(session, start_date, end_date)
+def draw_expensive(expensive):
+    expensive = filter_values(filter_values(expensive, 'QUERY_TYPE', selected_types), 'WAREHOUSE_NAME', selected_warehouses)
     if not expensive.empty:
-        st.dataframe(expensive, use_container_width=True)
+        selection = st.dataframe(expensive, use_container_width=True, on_select="rerun", selection_mode="single-row", key="expensive_table")
+        show_query_detail(expensive, selection)
     else:
         st.info("No expensive queries found")
 
-with tab2:
-    threshold = st.slider("Duration threshold (seconds)", 10, 300, 60)
-    with st.spinner("Loading slow queries..."):
-        slow = get_slow_queries(session, start_date, end_date, threshold)
+def draw_slow(slow):
+    slow = filter_values(filter_values(slow, 'QUERY_TYPE', selected_types), 'WAREHOUSE_NAME', selected_warehouses)
     if not slow.empty:
-        st.dataframe(slow, use_container_width=True)
+        selection = st.dataframe(slow, use_container_width=True, on_select="rerun", selection_mode="single-row", key="slow_table")
+        show_query_detail(slow, selection)
     else:
         st.info(f"No queries slower than {threshold}s")
 
-with tab3:
-    with st.spinner("Loading failed queries..."):
-        failed = get_failed_queries(session, start_date, end_date)
+def draw_failed(failed):
+    failed = filter_values(failed, 'WAREHOUSE_NAME', selected_warehouses)
     if not failed.empty:
         error_counts = failed.groupby('ERROR_TYPE').size().reset_index(name='COUNT')
         chart = alt.Chart(error_counts).mark_bar(color='#E74C3C').encode(
@@ -230,12 +319,63 @@ with tab3:
             y=alt.Y('ERROR_TYPE:N', title='', sort='-x')
         ).properties(height=150)
         st.altair_chart(chart, use_container_width=True)
-        st.dataframe(failed, use_container_width=True)
+        selection = st.dataframe(failed, use_container_width=True, on_select="rerun", selection_mode="single-row", key="failed_table")
+        show_query_detail(failed, selection)
     else:
         st.success("No failed queries!")
 
+def draw_warehouse_table(by_warehouse):
+    if not by_warehouse.empty:
+        by_warehouse = estimate(by_warehouse, sample_rate, counts=['QUERY_COUNT'], means=duration_interval)
+        st.dataframe(filter_values(by_warehouse, 'WAREHOUSE_NAME', selected_warehouses), use_container_width=True)
+
+loader.section("Query KPIs", st.empty(), ['metrics'], draw_kpis)
+
+st.markdown("---")
+
+st.subheader("Daily Query Volume")
+loader.section("Daily Query Volume", st.empty(), ['daily_volume'], draw_daily_volume, height=250)
+
+st.markdown("---")
+
+if approximate:
+    st.caption(f"By Query Type and By Warehouse are estimated from a {sample_rate}% row sample; bars show 95% confidence intervals")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader("By Query Type")
+    if selected_warehouses:
+        st.caption(f"Warehouses: {', '.join(selected_warehouses)}")
+    loader.section("By Query Type", st.empty(), ['by_type'], draw_by_type, height=300)
+
+with col2:
+    st.subheader("By Warehouse")
+    loader.section("By Warehouse", st.empty(), ['by_warehouse'], draw_by_warehouse, height=300)
+
+st.markdown("---")
+
+if selected_types or selected_warehouses:
+    st.caption("Tables filtered by the chart selections above")
+
+tab1, tab2, tab3 = st.tabs(["Expensive Queries", "Slow Queries", "Failed Queries"])
+
+with tab1:
+    st.caption("Top queries by data scanned")
+    loader.section("Expensive Queries", st.empty(), ['expensive'], draw_expensive, height=300)
+
+with tab2:
+    threshold = st.slider("Duration threshold (seconds)", 10, 300, 60)
+    loader.fetch('slow', get_slow_queries, session, start_date, end_date, threshold)
+    loader.section("Slow Queries", st.empty(), ['slow'], draw_slow, height=300)
+
+with tab3:
+    loader.section("Failed Queries", st.empty(), ['failed'], draw_failed, height=300)
+
 st.markdown("---")
 
 st.subheader("Queries by Warehouse")
-if not by_warehouse.empty:
-    st.dataframe(by_warehouse, use_container_width=True)
+loader.section("Queries by Warehouse", st.empty(), ['by_warehouse'], draw_warehouse_table, height=200)
+
+loader.run()
+show_timings("Query Performance")
@@ -1,28 +1,18 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from snowflake.snowpark.context import get_active_session
+from common.accounts import account_session
+from common.cache import dataset
+from common.execution import begin_run, run_query
+from common.registry import load
+from common.progressive import ProgressiveLoader, show_timings
 
-session = get_active_session()
+session = account_session()
+begin_run()
 
 st.title("Storage Analysis")
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_storage_overview(_session):
-    query = """
-    SELECT 
-        USAGE_DATE,
-        ROUND(STORAGE_BYTES / POWER(1024, 4), 4) as STORAGE_TB,
-        ROUND(STAGE_BYTES / POWER(1024, 4), 4) as STAGE_TB,
-        ROUND(FAILSAFE_BYTES / POWER(1024, 4), 4) as FAILSAFE_TB,
-        ROUND((STORAGE_BYTES + STAGE_BYTES + FAILSAFE_BYTES) / POWER(1024, 4), 4) as TOTAL_TB
-    FROM SNOWFLAKE.ACCOUNT_USAGE.STORAGE_USAGE
-    WHERE USAGE_DATE >= DATEADD('day', -90, CURRENT_DATE())
-    ORDER BY USAGE_DATE
-    """
-    return _session.sql(query).to_pandas()
-
-@st.cache_data(ttl=3600, show_spinner=False)
+@dataset(ttl=3600)
 def get_database_storage(_session):
     query = """
     SELECT 
@@ -35,9 +25,9 @@ def get_database_storage(_session):
     ORDER BY 2 DESC
     LIMIT 20
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@dataset(ttl=3600)
 def get_database_growth(_session):
     query = """
     SELECT 
@@ -48,9 +38,9 @@ def get_database_growth(_session):
     WHERE USAGE_DATE >= DATEADD('day', -30, CURRENT_DATE())
     ORDER BY USAGE_DATE
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@dataset(ttl=3600)
 def get_table_storage(_session):
     query = """
     SELECT 
@@ -68,32 +58,17 @@ def get_table_storage(_session):
     ORDER BY ACTIVE_BYTES DESC
     LIMIT 50
     """
-    return _session.sql(query).to_pandas()
+    return run_query(_session, query)
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_storage_by_type(_session):
-    query = """
-    WITH latest AS (
-        SELECT *
-        FROM SNOWFLAKE.ACCOUNT_USAGE.STORAGE_USAGE
-        WHERE USAGE_DATE = (SELECT MAX(USAGE_DATE) FROM SNOWFLAKE.ACCOUNT_USAGE.STORAGE_USAGE)
-    )
-    SELECT 
-        ROUND(STORAGE_BYTES / POWER(1024, 4), 4) as DATABASE_TB,
-        ROUND(STAGE_BYTES / POWER(1024, 4), 4) as STAGE_TB,
-        ROUND(FAILSAFE_BYTES / POWER(1024, 4), 4) as FAILSAFE_TB
-    FROM latest
-    """
-    return _session.sql(query).to_pandas()
-
-with st.spinner("Loading storage data..."):
-    storage_overview = get_storage_overview(session)
-    db_storage = get_database_storage(session)
-    db_growth = get_database_growth(session)
-    table_storage = get_table_storage(session)
-    storage_by_type = get_storage_by_type(session)
+loader = ProgressiveLoader("Storage Analysis")
+loader.fetch('storage_overview', load, session, 'daily_storage')
+loader.fetch('db_storage', get_database_storage, session)
+loader.fetch('db_growth', get_database_growth, session)
+loader.fetch('table_storage', get_table_storage, session)
 
-if not storage_overview.empty:
+def draw_kpis(storage_overview):
+    if storage_overview.empty:
+        return
     latest = storage_overview.iloc[-1]
     earliest = storage_overview.iloc[0]
     growth = latest['TOTAL_TB'] - earliest['TOTAL_TB']
@@ -109,36 +84,29 @@ if not storage_overview.empty:
     with col4:
         st.metric("90-Day Growth", f"{growth:+.2f} TB", f"{growth_pct:+.1f}%")
 
-st.markdown("---")
-
-st.subheader("Storage Trend (90 days)")
-if not storage_overview.empty:
-    storage_melted = storage_overview.melt(
-        id_vars=['USAGE_DATE'], 
-        value_vars=['STORAGE_TB', 'STAGE_TB', 'FAILSAFE_TB'], 
-        var_name='Type', 
-        value_name='TB'
-    )
-    storage_melted['Type'] = storage_melted['Type'].map({
-        'STORAGE_TB': 'Database',
-        'STAGE_TB': 'Stage',
-        'FAILSAFE_TB': 'Failsafe'
-    })
-    chart = alt.Chart(storage_melted).mark_area(opacity=0.7).encode(
-        x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
-        y=alt.Y('TB:Q', title='Storage (TB)', stack='zero'),
-        color=alt.Color('Type:N', scale=alt.Scale(domain=['Database', 'Stage', 'Failsafe'], range=['#29B5E8', '#1f84b3', '#71D3DC']))
-    ).properties(height=300)
-    st.altair_chart(chart, use_container_width=True)
-else:
-    st.info("No storage data")
-
-st.markdown("---")
-
-col1, col2 = st.columns(2)
+def draw_storage_trend(storage_overview):
+    if not storage_overview.empty:
+        storage_melted = storage_overview.melt(
+            id_vars=['USAGE_DATE'], 
+            value_vars=['STORAGE_TB', 'STAGE_TB', 'FAILSAFE_TB'], 
+            var_name='Type', 
+            value_name='TB'
+        )
+        storage_melted['Type'] = storage_melted['Type'].map({
+            'STORAGE_TB': 'Database',
+            'STAGE_TB': 'Stage',
+            'FAILSAFE_TB': 'Failsafe'
+        })
+        chart = alt.Chart(storage_melted).mark_area(opacity=0.7).encode(
+            x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
+            y=alt.Y('TB:Q', title='Storage (TB)', stack='zero'),
+            color=alt.Color('Type:N', scale=alt.Scale(domain=['Database', 'Stage', 'Failsafe'], range=['#29B5E8', '#1f84b3', '#71D3DC']))
+        ).properties(height=300)
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.info("No storage data")
 
-with col1:
-    st.subheader("Storage by Database")
+def draw_database_storage(db_storage):
     if not db_storage.empty:
         chart = alt.Chart(db_storage.head(10)).mark_bar(color='#29B5E8').encode(
             x=alt.X('AVG_DB_GB:Q', title='Avg Storage (GB)'),
@@ -148,16 +116,12 @@ with col1:
     else:
         st.info("No database storage data")
 
-with col2:
-    st.subheader("Storage Breakdown")
-    if not storage_by_type.empty:
+def draw_storage_breakdown(storage_overview):
+    if not storage_overview.empty:
+        latest = storage_overview.iloc[-1]
         breakdown_df = pd.DataFrame({
             'Type': ['Database', 'Stage', 'Failsafe'],
-            'TB': [
-                storage_by_type['DATABASE_TB'].iloc[0],
-                storage_by_type['STAGE_TB'].iloc[0],
-                storage_by_type['FAILSAFE_TB'].iloc[0]
-            ]
+            'TB': [latest['STORAGE_TB'], latest['STAGE_TB'], latest['FAILSAFE_TB']]
         })
         chart = alt.Chart(breakdown_df).mark_arc(innerRadius=50).encode(
             theta=alt.Theta('TB:Q'),
@@ -168,49 +132,77 @@ with col2:
     else:
         st.info("No breakdown data")
 
+def draw_database_growth(db_growth, db_storage):
+    if not db_growth.empty:
+        top_dbs = db_storage['DATABASE_NAME'].head(5).tolist()
+        filtered_growth = db_growth[db_growth['DATABASE_NAME'].isin(top_dbs)]
+        if not filtered_growth.empty:
+            chart = alt.Chart(filtered_growth).mark_line(strokeWidth=2).encode(
+                x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
+                y=alt.Y('DB_GB:Q', title='Storage (GB)'),
+                color=alt.Color('DATABASE_NAME:N', title='Database')
+            ).properties(height=250)
+            st.altair_chart(chart, use_container_width=True)
+    else:
+        st.info("No growth data")
+
+def draw_largest_tables(table_storage):
+    if not table_storage.empty:
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            db_filter = st.selectbox("Filter by Database", ["All"] + table_storage['DATABASE_NAME'].unique().tolist())
+        
+        filtered_tables = table_storage if db_filter == "All" else table_storage[table_storage['DATABASE_NAME'] == db_filter]
+        
+        st.dataframe(
+            filtered_tables[['DATABASE_NAME', 'SCHEMA_NAME', 'TABLE_NAME', 'ACTIVE_GB', 'TIME_TRAVEL_GB', 'FAILSAFE_GB', 'TOTAL_GB']],
+            use_container_width=True,
+            
+        )
+        
+        with st.expander("Time Travel Analysis"):
+            st.caption("Tables with significant Time Travel storage")
+            high_tt = table_storage[table_storage['TIME_TRAVEL_GB'] > 0.1].sort_values('TIME_TRAVEL_GB', ascending=False)
+            if not high_tt.empty:
+                st.dataframe(
+                    high_tt[['DATABASE_NAME', 'TABLE_NAME', 'ACTIVE_GB', 'TIME_TRAVEL_GB']],
+                    use_container_width=True,
+                    
+                )
+            else:
+                st.info("No tables with significant Time Travel storage")
+    else:
+        st.info("No table storage data")
+
+loader.section("Storage KPIs", st.empty(), ['storage_overview'], draw_kpis)
+
+st.markdown("---")
+
+st.subheader("Storage Trend (90 days)")
+loader.section("Storage Trend", st.empty(), ['storage_overview'], draw_storage_trend, height=300)
+
+st.markdown("---")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader("Storage by Database")
+    loader.section("Storage by Database", st.empty(), ['db_storage'], draw_database_storage, height=300)
+
+with col2:
+    st.subheader("Storage Breakdown")
+    loader.section("Storage Breakdown", st.empty(), ['storage_overview'], draw_storage_breakdown, height=250)
+
 st.markdown("---")
 
 st.subheader("Database Growth (30 days)")
-if not db_growth.empty:
-    top_dbs = db_storage['DATABASE_NAME'].head(5).tolist()
-    filtered_growth = db_growth[db_growth['DATABASE_NAME'].isin(top_dbs)]
-    if not filtered_growth.empty:
-        chart = alt.Chart(filtered_growth).mark_line(strokeWidth=2).encode(
-            x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
-            y=alt.Y('DB_GB:Q', title='Storage (GB)'),
-            color=alt.Color('DATABASE_NAME:N', title='Database')
-        ).properties(height=250)
-        st.altair_chart(chart, use_container_width=True)
-else:
-    st.info("No growth data")
+loader.section("Database Growth", st.empty(), ['db_growth', 'db_storage'], draw_database_growth, height=250)
 
 st.markdown("---")
 
 st.subheader("Largest Tables")
 st.caption("Top 50 tables by active storage")
-if not table_storage.empty:
-    col1, col2 = st.columns([1, 2])
-    with col1:
-        db_filter = st.selectbox("Filter by Database", ["All"] + table_storage['DATABASE_NAME'].unique().tolist())
-    
-    filtered_tables = table_storage if db_filter == "All" else table_storage[table_storage['DATABASE_NAME'] == db_filter]
-    
-    st.dataframe(
-        filtered_tables[['DATABASE_NAME', 'SCHEMA_NAME', 'TABLE_NAME', 'ACTIVE_GB', 'TIME_TRAVEL_GB', 'FAILSAFE_GB', 'TOTAL_GB']],
-        use_container_width=True,
-        
-    )
-    
-    with st.expander("Time Travel Analysis"):
-        st.caption("Tables with significant Time Travel storage")
-        high_tt = table_storage[table_storage['TIME_TRAVEL_GB'] > 0.1].sort_values('TIME_TRAVEL_GB', ascending=False)
-        if not high_tt.empty:
-            st.dataframe(
-                high_tt[['DATABASE_NAME', 'TABLE_NAME', 'ACTIVE_GB', 'TIME_TRAVEL_GB']],
-                use_container_width=True,
-                
-            )
-        else:
-            st.info("No tables with significant Time Travel storage")
-else:
-    st.info("No table storage data")
+loader.section("Largest Tables", st.empty(), ['table_storage'], draw_largest_tables, height=400)
+
+loader.run()
+show_timings("Storage Analysis")
@@ -0,0 +1,98 @@
+import streamlit as st
+from datetime import datetime, timedelta
+from common.accounts import account_session
+from common.export import DOWNLOAD_MAX_MB, EXPORT_SOURCES, FORMATS, ExportTooLarge, build_export_query, count_rows, stream_export, upload_to_stage
+from common.cache import dataset
+from common.execution import begin_run, run_query
+
+session = account_session()
+begin_run()
+
+st.title("Data Export")
+st.markdown("Stream raw ACCOUNT_USAGE extracts to a compressed file without loading them into memory.")
+
+@dataset(ttl=3600)
+def get_export_filter_values(_session, start, end):
+    query = f"""
+    SELECT DISTINCT WAREHOUSE_NAME, USER_NAME
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+    WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
+    """
+    return run_query(_session, query)
+
+col1, col2 = st.columns(2)
+with col1:
+    source = st.selectbox("Dataset", list(EXPORT_SOURCES))
+with col2:
+    fmt = st.selectbox("Format", list(FORMATS))
+
+end_default = datetime.now().date()
+col1, col2 = st.columns(2)
+with col1:
+    start_date = st.date_input("Start date", end_default - timedelta(days=7))
+with col2:
+    end_date = st.date_input("End date (exclusive)", end_default)
+
+if start_date >= end_date:
+    st.warning("Start date must be before end date")
+    st.stop()
+
+filter_values = get_export_filter_values(session, start_date, end_date)
+filters = EXPORT_SOURCES[source]["filters"]
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    warehouses = st.multiselect("Warehouses", sorted(filter_values['WAREHOUSE_NAME'].dropna().unique().tolist()))
+with col2:
+    users = st.multiselect(
+        "Users",
+        sorted(filter_values['USER_NAME'].dropna().unique().tolist()),
+        disabled="user" not in filters
+    )
+with col3:
+    statuses = st.multiselect(
+        "Execution Status",
+        ["SUCCESS", "FAIL", "INCIDENT"],
+        disabled="status" not in filters
+    )
+
+query = build_export_query(source, start_date, end_date, warehouses, users, statuses)
+
+with st.expander("Export SQL"):
+    st.code(query, language="sql")
+
+destination = st.radio("Destination", ["Download", "Stage"], horizontal=True)
+stage_path = None
+if destination == "Stage":
+    stage_path = st.text_input("Stage path", "@USAGE_INSIGHTS.APP.EXPORT_STAGE/")
+else:
+    st.caption(f"Downloads are limited to {DOWNLOAD_MAX_MB:,} MB, since the browser download is served from memory. Export larger extracts to a stage.")
+
+if st.button("Run Export", type="primary"):
+    with st.spinner("Counting rows..."):
+        total_rows = count_rows(session, query)
+    if total_rows == 0:
+        st.info("No rows match the selected filters")
+        st.stop()
+
+    progress = st.progress(0.0, text=f"Exported 0 of {total_rows:,} rows")
+    exported = 0
+
+    def on_batch(rows):
+        global exported
+        exported += rows
+        progress.progress(min(exported / total_rows, 1.0), text=f"Exported {exported:,} of {total_rows:,} rows")
+
+    try:
+        out = stream_export(session, query, fmt, on_batch, max_bytes=DOWNLOAD_MAX_MB * 1024 * 1024 if destination == "Download" else None)
+    except ExportTooLarge:
+        st.error(f"The export is larger than the {DOWNLOAD_MAX_MB:,} MB download limit. Choose Stage as the destination and fetch the file with GET, or narrow the filters.")
+        st.stop()
+    file_name = f"{source.lower().replace(' ', '_')}_{start_date}_{end_date}.{FORMATS[fmt]['extension']}"
+    progress.progress(1.0, text=f"Exported {exported:,} rows")
+
+    if destination == "Stage":
+        target = upload_to_stage(session, out, stage_path.rstrip('/') + '/' + file_name)
+        st.success(f"Uploaded to {target}")
+    else:
+        st.download_button("Download " + file_name, out, file_name=file_name, mime=FORMATS[fmt]['mime'])
@@ -0,0 +1,156 @@
+import json
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+from datetime import datetime, timedelta
+from common.accounts import account_session
+from common.cache import dataset
+from common.execution import begin_run, run_query
+
+session = account_session()
+begin_run()
+
+st.title("Fleet Utilization")
+st.markdown("Every warehouse by hour of week, from a single pivoted query.")
+
+days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90], index=2, format_func=lambda x: f"Last {x} days")
+
+end_date = datetime.now().date()
+start_date = end_date - timedelta(days=days_back)
+
+METRICS = {
+    'Credits': ('CREDITS', 'Avg credits per hour'),
+    'Query Load': ('EXEC_HOURS', 'Avg execution hours per hour'),
+    'Queue Time': ('QUEUE_MINS', 'Avg queued minutes per hour'),
+    'Idle Share': ('IDLE_SHARE', 'Share of metered hours with no queries'),
+}
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+@dataset(ttl=3600)
+def get_fleet_matrix(_session, start, end):
+    query = f"""
+    WITH hours AS (
+        SELECT ROW_NUMBER() OVER (ORDER BY SEQ4()) - 1 as HOUR_OF_WEEK
+        FROM TABLE(GENERATOR(ROWCOUNT => 168))
+    ),
+    metering AS (
+        SELECT 
+            WAREHOUSE_NAME,
+            DATE_TRUNC('HOUR', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_HOUR,
+            SUM(CREDITS_USED) as CREDITS
+        FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
+        WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
+        GROUP BY 1, 2
+    ),
+    queries AS (
+        SELECT 
+            WAREHOUSE_NAME,
+            DATE_TRUNC('HOUR', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_HOUR,
+            COUNT(*) as QUERY_COUNT,
+            SUM(EXECUTION_TIME) / 3600000 as EXEC_HOURS,
+            SUM(QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME + QUEUED_OVERLOAD_TIME) / 60000 as QUEUE_MINS
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE START_TIME >= '{start}' AND START_TIME < '{end}'
+            AND WAREHOUSE_NAME IS NOT NULL
+        GROUP BY 1, 2
+    ),
+    hourly AS (
+        SELECT 
+            COALESCE(m.WAREHOUSE_NAME, q.WAREHOUSE_NAME) as WAREHOUSE_NAME,
+            COALESCE(m.USAGE_HOUR, q.USAGE_HOUR) as USAGE_HOUR,
+            COALESCE(m.CREDITS, 0) as CREDITS,
+            COALESCE(q.QUERY_COUNT, 0) as QUERY_COUNT,
+            COALESCE(q.EXEC_HOURS, 0) as EXEC_HOURS,
+            COALESCE(q.QUEUE_MINS, 0) as QUEUE_MINS
+        FROM metering m
+        FULL OUTER JOIN queries q
+            ON m.WAREHOUSE_NAME = q.WAREHOUSE_NAME AND m.USAGE_HOUR = q.USAGE_HOUR
+    ),
+    by_slot AS (
+        SELECT 
+            WAREHOUSE_NAME,
+            (DAYOFWEEKISO(USAGE_HOUR) - 1) * 24 + HOUR(USAGE_HOUR) as HOUR_OF_WEEK,
+            SUM(CREDITS) as CREDITS,
+            SUM(EXEC_HOURS) as EXEC_HOURS,
+            SUM(QUEUE_MINS) as QUEUE_MINS,
+            COUNT_IF(CREDITS > 0 AND QUERY_COUNT = 0) / NULLIF(COUNT_IF(CREDITS > 0), 0) as IDLE_SHARE
+        FROM hourly
+        GROUP BY 1, 2
+    ),
+    dense AS (
+        SELECT 
+            w.WAREHOUSE_NAME,
+            h.HOUR_OF_WEEK,
+            ROUND(COALESCE(s.CREDITS, 0), 4) as CREDITS,
+            ROUND(COALESCE(s.EXEC_HOURS, 0), 4) as EXEC_HOURS,
+            ROUND(COALESCE(s.QUEUE_MINS, 0), 2) as QUEUE_MINS,
+            ROUND(COALESCE(s.IDLE_SHARE, 0), 3) as IDLE_SHARE
+        FROM (SELECT DISTINCT WAREHOUSE_NAME FROM by_slot) w
+        CROSS JOIN hours h
+        LEFT JOIN by_slot s
+            ON s.WAREHOUSE_NAME = w.WAREHOUSE_NAME AND s.HOUR_OF_WEEK = h.HOUR_OF_WEEK
+    )
+    SELECT 
+        WAREHOUSE_NAME,
+        ARRAY_AGG(CREDITS) WITHIN GROUP (ORDER BY HOUR_OF_WEEK) as CREDITS_BY_HOUR,
+        ARRAY_AGG(EXEC_HOURS) WITHIN GROUP (ORDER BY HOUR_OF_WEEK) as EXEC_HOURS_BY_HOUR,
+        ARRAY_AGG(QUEUE_MINS) WITHIN GROUP (ORDER BY HOUR_OF_WEEK) as QUEUE_MINS_BY_HOUR,
+        ARRAY_AGG(IDLE_SHARE) WITHIN GROUP (ORDER BY HOUR_OF_WEEK) as IDLE_SHARE_BY_HOUR,
+        SUM(CREDITS) as TOTAL_CREDITS
+    FROM dense
+    GROUP BY 1
+    ORDER BY TOTAL_CREDITS DESC
+    """
+    return run_query(_session, query)
+
+def to_matrix(column):
+    return np.array([json.loads(v) if isinstance(v, str) else v for v in column], dtype=np.float32)
+
+with st.spinner("Loading fleet utilization..."):
+    fleet = get_fleet_matrix(session, start_date, end_date)
+
+if fleet.empty:
+    st.info("No warehouse activity for the selected period")
+    st.stop()
+
+weeks = days_back / 7
+matrices = {
+    'CREDITS': to_matrix(fleet['CREDITS_BY_HOUR']) / weeks,
+    'EXEC_HOURS': to_matrix(fleet['EXEC_HOURS_BY_HOUR']) / weeks,
+    'QUEUE_MINS': to_matrix(fleet['QUEUE_MINS_BY_HOUR']) / weeks,
+    'IDLE_SHARE': to_matrix(fleet['IDLE_SHARE_BY_HOUR']),
+}
+warehouses = fleet['WAREHOUSE_NAME'].tolist()
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Warehouses", f"{len(warehouses):,}")
+with col2:
+    st.metric("Avg Credits / Week", f"{matrices['CREDITS'].sum():,.0f}")
+with col3:
+    metered = matrices['CREDITS'] > 0
+    idle = (matrices['IDLE_SHARE'] * metered).sum() / metered.sum() if metered.any() else 0
+    st.metric("Avg Idle Share", f"{idle * 100:.1f}%")
+
+st.markdown("---")
+
+metric = st.radio("Metric", list(METRICS), horizontal=True)
+column, description = METRICS[metric]
+st.caption(f"{description}, by hour of week (UTC). Warehouses sorted by total credits.")
+
+heatmap = pd.DataFrame({
+    'WAREHOUSE_NAME': np.repeat(warehouses, 168),
+    'HOUR_OF_WEEK': np.tile(np.arange(168, dtype=np.int16), len(warehouses)),
+    'VALUE': matrices[column].ravel(),
+})
+heatmap['SLOT'] = [f"{DAYS[h // 24]} {h % 24:02d}:00" for h in heatmap['HOUR_OF_WEEK']]
+
+chart = alt.Chart(heatmap).mark_rect().encode(
+    x=alt.X('HOUR_OF_WEEK:O', title='Hour of Week (Mon 00:00 - Sun 23:00)',
+            axis=alt.Axis(values=list(range(0, 168, 24)), labelExpr="['Mon','Tue','Wed','Thu','Fri','Sat','Sun'][datum.value / 24]")),
+    y=alt.Y('WAREHOUSE_NAME:N', title='', sort=warehouses),
+    color=alt.Color('VALUE:Q', title=metric, scale=alt.Scale(scheme='blues')),
+    tooltip=['WAREHOUSE_NAME:N', 'SLOT:N', alt.Tooltip('VALUE:Q', title=metric, format=',.3f')]
+).properties(height=max(200, 14 * len(warehouses)))
+st.altair_chart(chart, use_container_width=True)
@@ -0,0 +1,147 @@
+import streamlit as st
+import pandas as pd
+import altair as alt
+from common.accounts import account_session
+from common.cache import dataset
+from common.live import ACCOUNT_USAGE_LAG_HOURS, QUERY_RESULT_LIMIT, LiveTail, account_usage_cutoff, stitch, to_epoch
+from common.selection import UTC_SCALE
+from common.execution import begin_fragment, begin_run, run_query
+
+session = account_session()
+begin_run()
+
+st.title("Live Monitor")
+st.markdown("Recent activity: ACCOUNT_USAGE history stitched to INFORMATION_SCHEMA for the last few hours it has not caught up on.")
+
+col1, col2, col3 = st.columns([1, 1, 1])
+with col1:
+    hours_back = st.selectbox("Window", [6, 12, 24, 48], index=2, format_func=lambda x: f"Last {x} hours")
+with col2:
+    refresh_secs = st.selectbox("Refresh every", [30, 60, 300], index=1, format_func=lambda x: f"{x}s" if x < 60 else f"{x // 60} min")
+with col3:
+    live = st.toggle("Live", value=True, help="Poll INFORMATION_SCHEMA for new activity without reloading the page")
+
+@dataset(ttl=3600)
+def get_hourly_history(_session, start, cutoff):
+    query = f"""
+    WITH credits AS (
+        SELECT 
+            CONVERT_TIMEZONE('UTC', START_TIME)::TIMESTAMP_NTZ as USAGE_HOUR,
+            SUM(CREDITS_USED) as CREDITS
+        FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
+        WHERE START_TIME >= TO_TIMESTAMP_LTZ({to_epoch(start)})
+            AND START_TIME < TO_TIMESTAMP_LTZ({to_epoch(cutoff)})
+        GROUP BY 1
+    ),
+    queries AS (
+        SELECT 
+            DATE_TRUNC('HOUR', CONVERT_TIMEZONE('UTC', START_TIME))::TIMESTAMP_NTZ as USAGE_HOUR,
+            COUNT(*) as QUERY_COUNT
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE START_TIME >= TO_TIMESTAMP_LTZ({to_epoch(start)})
+            AND START_TIME < TO_TIMESTAMP_LTZ({to_epoch(cutoff)})
+        GROUP BY 1
+    )
+    SELECT 
+        COALESCE(c.USAGE_HOUR, q.USAGE_HOUR) as USAGE_HOUR,
+        ROUND(COALESCE(c.CREDITS, 0), 4) as CREDITS,
+        COALESCE(q.QUERY_COUNT, 0) as QUERY_COUNT
+    FROM credits c
+    FULL OUTER JOIN queries q ON c.USAGE_HOUR = q.USAGE_HOUR
+    ORDER BY 1
+    """
+    return run_query(_session, query)
+
+def live_hourly(tail):
+    frames = []
+    if not tail.metering.empty:
+        frames.append(tail.metering.groupby('START_TIME', as_index=False)['CREDITS'].sum().rename(columns={'START_TIME': 'USAGE_HOUR'}))
+    if not tail.queries.empty:
+        queries = tail.queries.assign(USAGE_HOUR=tail.queries['START_TIME'].dt.floor('h'))
+        frames.append(queries.groupby('USAGE_HOUR', as_index=False).agg(QUERY_COUNT=('QUERY_ID', 'size')))
+    if not frames:
+        return pd.DataFrame(columns=['USAGE_HOUR', 'CREDITS', 'QUERY_COUNT'])
+    merged = frames[0]
+    for frame in frames[1:]:
+        merged = merged.merge(frame, on='USAGE_HOUR', how='outer')
+    return merged.fillna(0)
+
+@st.fragment(run_every=refresh_secs if live else None)
+def live_section():
+    begin_fragment()
+    cutoff = account_usage_cutoff()
+    window_start = cutoff - pd.Timedelta(hours=max(hours_back - ACCOUNT_USAGE_LAG_HOURS, 0))
+    history = get_hourly_history(session, window_start, cutoff)
+
+    tail = st.session_state.get(f"live_tail_{session.account}")
+    if tail is None:
+        tail = st.session_state[f"live_tail_{session.account}"] = LiveTail(cutoff)
+    tail.advance(cutoff)
+    tail.poll(session)
+    hourly = stitch(history, live_hourly(tail), cutoff, 'USAGE_HOUR')
+
+    running = tail.queries[tail.queries['EXECUTION_STATUS'].isin(['RUNNING', 'QUEUED', 'RESUMING_WAREHOUSE'])] if not tail.queries.empty else tail.queries
+    latest_load = tail.load[tail.load['START_TIME'] == tail.load['START_TIME'].max()] if not tail.load.empty else tail.load
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Running Now", len(running))
+    with col2:
+        st.metric("Avg Queued Load", f"{latest_load['AVG_QUEUED'].sum():.2f}" if not latest_load.empty else "0.00")
+    with col3:
+        live_credits = tail.metering['CREDITS'].sum() if not tail.metering.empty else 0
+        st.metric("Credits Since Cutoff", f"{live_credits:,.2f}")
+    with col4:
+        st.metric("Queries Since Cutoff", f"{len(tail.queries):,}")
+
+    st.caption(
+        f"ACCOUNT_USAGE up to {cutoff:%H:%M} UTC, live after. Last poll {tail.watermark:%H:%M:%S} UTC: "
+        f"{tail.last_delta_rows:,} new rows in {tail.last_poll_secs:.1f}s ({tail.polls} polls this session)"
+    )
+    if tail.truncated_until is not None:
+        st.warning(
+            f"A poll returned INFORMATION_SCHEMA's limit of {QUERY_RESULT_LIMIT:,} queries, so queries before "
+            f"{tail.truncated_until:%H:%M} UTC are undercounted until ACCOUNT_USAGE catches up."
+        )
+
+    if not hourly.empty:
+        cutoff_rule = alt.Chart(pd.DataFrame({'USAGE_HOUR': [cutoff]})).mark_rule(strokeDash=[4, 4], color='#888888').encode(x=alt.X('USAGE_HOUR:T', scale=UTC_SCALE))
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Hourly Credits")
+            chart = alt.Chart(hourly).mark_bar().encode(
+                x=alt.X('USAGE_HOUR:T', title='Hour (UTC)', scale=UTC_SCALE, axis=alt.Axis(format='%b %d %H:%M')),
+                y=alt.Y('CREDITS:Q', title='Credits'),
+                color=alt.Color('SOURCE:N', scale=alt.Scale(domain=['ACCOUNT_USAGE', 'Live'], range=['#29B5E8', '#1f84b3']), title='Source')
+            )
+            st.altair_chart((chart + cutoff_rule).properties(height=250), use_container_width=True)
+        with col2:
+            st.subheader("Hourly Queries")
+            chart = alt.Chart(hourly).mark_bar().encode(
+                x=alt.X('USAGE_HOUR:T', title='Hour (UTC)', scale=UTC_SCALE, axis=alt.Axis(format='%b %d %H:%M')),
+                y=alt.Y('QUERY_COUNT:Q', title='Queries'),
+                color=alt.Color('SOURCE:N', scale=alt.Scale(domain=['ACCOUNT_USAGE', 'Live'], range=['#29B5E8', '#1f84b3']), title='Source')
+            )
+            st.altair_chart((chart + cutoff_rule).properties(height=250), use_container_width=True)
+    else:
+        st.info("No activity in the selected window")
+
+    st.subheader("Warehouse Load")
+    if not tail.load.empty:
+        load = tail.load.melt(id_vars=['WAREHOUSE_NAME', 'START_TIME'], value_vars=['AVG_RUNNING', 'AVG_QUEUED'], var_name='Load', value_name='Value')
+        chart = alt.Chart(load).mark_line(strokeWidth=2).encode(
+            x=alt.X('START_TIME:T', title='Time (UTC)', scale=UTC_SCALE, axis=alt.Axis(format='%H:%M')),
+            y=alt.Y('Value:Q', title='Avg Queries'),
+            color=alt.Color('WAREHOUSE_NAME:N', title='Warehouse'),
+            strokeDash=alt.StrokeDash('Load:N', title='')
+        ).properties(height=250)
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.info("No warehouse load since the cutoff")
+
+    st.subheader("Latest Queries")
+    if not tail.queries.empty:
+        st.dataframe(tail.queries.sort_values('START_TIME', ascending=False).head(50), use_container_width=True)
+    else:
+        st.info("No queries since the cutoff")
+
+live_section()
@@ -0,0 +1,223 @@
+import streamlit as st
+import pandas as pd
+import altair as alt
+from datetime import datetime, timedelta
+from common.accounts import account_session
+from common.incremental import daily_dataset, utc_day, utc_window
+from common.simulator import credits_per_hour_sql
+from common.execution import begin_run, run_query
+from common.progressive import ProgressiveLoader, show_timings
+
+session = account_session()
+begin_run()
+
+st.title("Pruning Analysis")
+st.markdown("How much of each table queries actually read, and where full scans cost the most credits.")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    days_back = st.selectbox("Time Period", [7, 14, 30], index=2, format_func=lambda x: f"Last {x} days")
+with col2:
+    threshold = st.select_slider("Poorly pruned when scanning at least", [50, 80, 90, 95], value=80, format_func=lambda x: f"{x}% of partitions")
+with col3:
+    min_partitions = st.selectbox("Ignore tables smaller than", [10, 100, 1000], index=1, format_func=lambda x: f"{x:,} partitions")
+
+end_date = datetime.now().date()
+start_date = end_date - timedelta(days=days_back)
+
+QUERY_CREDITS = f"EXECUTION_TIME / 3600000 * {credits_per_hour_sql()}"
+SCAN_BUCKETS = [95, 90, 80, 50]
+SIZE_BUCKETS = [1000, 100, 10]
+
+def bucket_sql(expr, buckets, otherwise):
+    cases = ' '.join(f"WHEN {expr} >= {b} THEN {b}" for b in buckets)
+    return f"CASE {cases} ELSE {otherwise} END"
+
+SCAN_BUCKET = bucket_sql("PARTITIONS_SCANNED * 100 / PARTITIONS_TOTAL", SCAN_BUCKETS, 0)
+SIZE_BUCKET = bucket_sql("PARTITIONS_TOTAL", SIZE_BUCKETS, 0)
+
+@daily_dataset(ttl=3600)
+def get_pattern_pruning(_session, start, end):
+    query = f"""
+    SELECT
+        {utc_day('START_TIME')} as USAGE_DATE,
+        QUERY_PARAMETERIZED_HASH,
+        {SIZE_BUCKET} as SIZE_BUCKET,
+        {SCAN_BUCKET} as SCAN_BUCKET,
+        ANY_VALUE(LEFT(QUERY_TEXT, 500)) as SAMPLE_QUERY,
+        ANY_VALUE(WAREHOUSE_NAME) as WAREHOUSE_NAME,
+        COUNT(*) as QUERY_COUNT,
+        SUM(PARTITIONS_SCANNED) as PARTITIONS_SCANNED,
+        SUM(PARTITIONS_TOTAL) as PARTITIONS_TOTAL,
+        SUM(BYTES_SCANNED) / POWER(1024, 3) as GB_SCANNED,
+        SUM({QUERY_CREDITS}) as CREDITS
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+    WHERE {utc_window('START_TIME', start, end)}
+        AND EXECUTION_STATUS = 'SUCCESS'
+        AND QUERY_PARAMETERIZED_HASH IS NOT NULL
+        AND PARTITIONS_TOTAL >= {SIZE_BUCKETS[-1]}
+    GROUP BY 1, 2, 3, 4
+    """
+    return run_query(_session, query)
+
+@daily_dataset(ttl=3600)
+def get_table_pruning(_session, start, end):
+    query = f"""
+    WITH scans AS (
+        SELECT
+            QUERY_ID,
+            {utc_day('START_TIME')} as USAGE_DATE,
+            {SIZE_BUCKET} as SIZE_BUCKET,
+            {SCAN_BUCKET} as SCAN_BUCKET,
+            PARTITIONS_SCANNED,
+            PARTITIONS_TOTAL,
+            BYTES_SCANNED,
+            {QUERY_CREDITS} as CREDITS
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE {utc_window('START_TIME', start, end)}
+            AND EXECUTION_STATUS = 'SUCCESS'
+            AND PARTITIONS_TOTAL >= {SIZE_BUCKETS[-1]}
+    ),
+    tables AS (
+        SELECT DISTINCT
+            ah.QUERY_ID,
+            obj.value:"objectName"::STRING as TABLE_NAME
+        FROM SNOWFLAKE.ACCOUNT_USAGE.ACCESS_HISTORY ah,
+            LATERAL FLATTEN(input => ah.BASE_OBJECTS_ACCESSED) obj
+        WHERE {utc_window('ah.QUERY_START_TIME', start, end)}
+            AND obj.value:"objectDomain"::STRING = 'Table'
+    ),
+    shares AS (
+        SELECT
+            QUERY_ID,
+            TABLE_NAME,
+            1 / COUNT(*) OVER (PARTITION BY QUERY_ID) as SHARE
+        FROM tables
+    )
+    SELECT
+        s.USAGE_DATE,
+        t.TABLE_NAME,
+        s.SIZE_BUCKET,
+        s.SCAN_BUCKET,
+        COUNT(*) as QUERY_COUNT,
+        SUM(s.PARTITIONS_SCANNED * t.SHARE) as PARTITIONS_SCANNED,
+        SUM(s.PARTITIONS_TOTAL * t.SHARE) as PARTITIONS_TOTAL,
+        SUM(s.BYTES_SCANNED * t.SHARE) / POWER(1024, 3) as GB_SCANNED,
+        SUM(s.CREDITS * t.SHARE) as CREDITS
+    FROM scans s
+    JOIN shares t ON s.QUERY_ID = t.QUERY_ID
+    GROUP BY 1, 2, 3, 4
+    """
+    return run_query(_session, query)
+
+def apply_thresholds(partials, threshold, min_partitions):
+    """Drop small-table scans and mark poorly pruned ones from the bucketed partials."""
+    if partials.empty:
+        return partials
+    rows = partials[partials['SIZE_BUCKET'] >= min_partitions]
+    poor = rows['SCAN_BUCKET'] >= threshold
+    return rows.assign(
+        POORLY_PRUNED_CREDITS=rows['CREDITS'].where(poor, 0),
+        POORLY_PRUNED_QUERIES=rows['QUERY_COUNT'].where(poor, 0)
+    ).drop(columns=['SIZE_BUCKET', 'SCAN_BUCKET'])
+
+def rollup(partials, keys, first=()):
+    """Merge per-day partials into one row per key with a scan ratio."""
+    sums = {c: 'sum' for c in partials.columns if c not in keys and c != 'USAGE_DATE' and c not in first}
+    totals = partials.groupby(keys, as_index=False).agg({**sums, **{c: 'first' for c in first}})
+    totals['PCT_SCANNED'] = totals['PARTITIONS_SCANNED'] / totals['PARTITIONS_TOTAL'].where(totals['PARTITIONS_TOTAL'] > 0) * 100
+    totals['PCT_POORLY_PRUNED_CREDITS'] = totals['POORLY_PRUNED_CREDITS'] / totals['CREDITS'].where(totals['CREDITS'] > 0) * 100
+    return totals.sort_values('POORLY_PRUNED_CREDITS', ascending=False, ignore_index=True)
+
+def load_thresholded(fn):
+    return apply_thresholds(fn(session, start_date, end_date), threshold, min_partitions)
+
+loader = ProgressiveLoader("Pruning Analysis")
+loader.fetch('patterns', load_thresholded, get_pattern_pruning)
+loader.fetch('tables', load_thresholded, get_table_pruning)
+
+def draw_kpis(patterns):
+    if patterns.empty:
+        st.info("No pruned table scans in this period")
+        return
+    scanned = patterns['PARTITIONS_SCANNED'].sum()
+    total = patterns['PARTITIONS_TOTAL'].sum()
+    credits = patterns['CREDITS'].sum()
+    poor = patterns['POORLY_PRUNED_CREDITS'].sum()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Queries Analyzed", f"{patterns['QUERY_COUNT'].sum():,}")
+    with col2:
+        st.metric("Partitions Pruned", f"{(1 - scanned / total) * 100:.1f}%" if total > 0 else "n/a")
+    with col3:
+        st.metric("Credits on Poor Scans", f"{poor:,.1f}")
+    with col4:
+        st.metric("Share of Scan Credits", f"{poor / credits * 100:.1f}%" if credits > 0 else "n/a")
+
+def draw_daily_pruning(patterns):
+    if patterns.empty:
+        return
+    daily = patterns.groupby('USAGE_DATE', as_index=False)[['PARTITIONS_SCANNED', 'PARTITIONS_TOTAL', 'POORLY_PRUNED_CREDITS']].sum()
+    daily['PCT_SCANNED'] = daily['PARTITIONS_SCANNED'] / daily['PARTITIONS_TOTAL'] * 100
+    base = alt.Chart(daily).encode(x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')))
+    bars = base.mark_bar(color='#71D3DC', opacity=0.6).encode(y=alt.Y('POORLY_PRUNED_CREDITS:Q', title='Credits on Poor Scans'))
+    line = base.mark_line(color='#29B5E8', strokeWidth=2).encode(y=alt.Y('PCT_SCANNED:Q', title='% Partitions Scanned', scale=alt.Scale(domain=[0, 100])))
+    st.altair_chart(alt.layer(bars, line).resolve_scale(y='independent').properties(height=250), use_container_width=True)
+
+def draw_table_candidates(tables):
+    if tables.empty:
+        st.info("No table access data - ACCESS_HISTORY requires Enterprise Edition")
+        return
+    candidates = rollup(tables, ['TABLE_NAME'])
+    candidates = candidates[candidates['POORLY_PRUNED_CREDITS'] > 0]
+    if candidates.empty:
+        st.success("No tables with poorly pruned scans")
+        return
+    top = candidates.head(15)
+    chart = alt.Chart(top).mark_bar().encode(
+        x=alt.X('POORLY_PRUNED_CREDITS:Q', title='Credits on Poor Scans'),
+        y=alt.Y('TABLE_NAME:N', title='', sort='-x'),
+        color=alt.Color('PCT_SCANNED:Q', title='% Scanned', scale=alt.Scale(domain=[0, 100], range=['#71D3DC', '#11567F'])),
+        tooltip=['TABLE_NAME:N', alt.Tooltip('POORLY_PRUNED_CREDITS:Q', format=',.2f'), alt.Tooltip('PCT_SCANNED:Q', format='.1f'), 'QUERY_COUNT:Q']
+    ).properties(height=350)
+    st.altair_chart(chart, use_container_width=True)
+    st.dataframe(
+        candidates[['TABLE_NAME', 'POORLY_PRUNED_CREDITS', 'PCT_POORLY_PRUNED_CREDITS', 'CREDITS', 'PCT_SCANNED', 'QUERY_COUNT', 'POORLY_PRUNED_QUERIES', 'GB_SCANNED']].head(50),
+        use_container_width=True
+    )
+
+def draw_pattern_candidates(patterns):
+    if patterns.empty:
+        return
+    ranked = rollup(patterns, ['QUERY_PARAMETERIZED_HASH'], first=('SAMPLE_QUERY', 'WAREHOUSE_NAME'))
+    ranked = ranked[ranked['POORLY_PRUNED_CREDITS'] > 0]
+    if ranked.empty:
+        st.success("No query patterns with poorly pruned scans")
+        return
+    st.dataframe(
+        ranked[['QUERY_PARAMETERIZED_HASH', 'WAREHOUSE_NAME', 'POORLY_PRUNED_CREDITS', 'CREDITS', 'PCT_SCANNED', 'QUERY_COUNT', 'GB_SCANNED', 'SAMPLE_QUERY']].head(50),
+        use_container_width=True
+    )
+
+loader.section("Pruning KPIs", st.empty(), ['patterns'], draw_kpis)
+
+st.markdown("---")
+
+st.subheader("Daily Pruning")
+st.caption("Share of partitions scanned, and credits spent on poorly pruned scans")
+loader.section("Daily Pruning", st.empty(), ['patterns'], draw_daily_pruning, height=250)
+
+st.markdown("---")
+
+st.subheader("Clustering Candidates")
+st.caption("Tables ranked by credits spent on poorly pruned scans. Filters on a few columns suggest a clustering key; selective point lookups suggest search optimization. Credits are estimated from execution time and warehouse size, and queries touching several tables are split evenly between them.")
+loader.section("Clustering Candidates", st.empty(), ['tables'], draw_table_candidates, height=350)
+
+st.markdown("---")
+
+st.subheader("Query Patterns")
+st.caption("Parameterized query patterns ranked by credits spent on poorly pruned scans")
+loader.section("Query Patterns", st.empty(), ['patterns'], draw_pattern_candidates, height=300)
+
+loader.run()
+show_timings("Pruning Analysis")
@@ -0,0 +1,178 @@
+import streamlit as st
+import pandas as pd
+import altair as alt
+from datetime import datetime, timedelta
+from common.accounts import account_session
+from common.incremental import daily_dataset, utc_day, utc_window
+from common.simulator import credits_per_hour_sql
+from common.execution import begin_run, run_query
+from common.progressive import ProgressiveLoader, show_timings
+
+session = account_session()
+begin_run()
+
+st.title("Cost Attribution")
+st.markdown("Who is spending: estimated warehouse credits by user, role, query tag and warehouse.")
+
+col1, col2 = st.columns([2, 1])
+with col1:
+    days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90], index=2, format_func=lambda x: f"Last {x} days")
+with col2:
+    top_k = st.select_slider("Top", [5, 10, 20], value=10)
+
+end_date = datetime.now().date()
+start_date = end_date - timedelta(days=days_back)
+
+DAILY_TOP_K = 50
+DIMENSIONS = {
+    'USER': 'User',
+    'ROLE': 'Role',
+    'QUERY_TAG': 'Query Tag',
+    'WAREHOUSE': 'Warehouse',
+}
+
+@daily_dataset(ttl=3600)
+def get_daily_attribution(_session, start, end):
+    query = f"""
+    WITH attributed AS (
+        SELECT
+            {utc_day('START_TIME')} as USAGE_DATE,
+            USER_NAME,
+            ROLE_NAME,
+            COALESCE(NULLIF(QUERY_TAG, ''), '(untagged)') as QUERY_TAG,
+            WAREHOUSE_NAME,
+            EXECUTION_TIME / 3600000 as EXEC_HOURS,
+            EXECUTION_TIME / 3600000 * {credits_per_hour_sql()} as CREDITS
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE {utc_window('START_TIME', start, end)}
+            AND WAREHOUSE_NAME IS NOT NULL
+            AND EXECUTION_TIME > 0
+    ),
+    grouped AS (
+        SELECT
+            USAGE_DATE,
+            CASE
+                WHEN GROUPING(USER_NAME) = 0 THEN 'USER'
+                WHEN GROUPING(ROLE_NAME) = 0 THEN 'ROLE'
+                WHEN GROUPING(QUERY_TAG) = 0 THEN 'QUERY_TAG'
+                ELSE 'WAREHOUSE'
+            END as DIMENSION,
+            COALESCE(
+                CASE
+                    WHEN GROUPING(USER_NAME) = 0 THEN USER_NAME
+                    WHEN GROUPING(ROLE_NAME) = 0 THEN ROLE_NAME
+                    WHEN GROUPING(QUERY_TAG) = 0 THEN QUERY_TAG
+                    ELSE WAREHOUSE_NAME
+                END, '(none)'
+            ) as MEMBER,
+            COUNT(*) as QUERY_COUNT,
+            SUM(EXEC_HOURS) as EXEC_HOURS,
+            SUM(CREDITS) as CREDITS
+        FROM attributed
+        GROUP BY GROUPING SETS (
+            (USAGE_DATE, USER_NAME),
+            (USAGE_DATE, ROLE_NAME),
+            (USAGE_DATE, QUERY_TAG),
+            (USAGE_DATE, WAREHOUSE_NAME)
+        )
+    ),
+    ranked AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY USAGE_DATE, DIMENSION ORDER BY CREDITS DESC NULLS LAST) as MEMBER_RANK
+        FROM grouped
+    )
+    SELECT
+        USAGE_DATE,
+        DIMENSION,
+        IFF(MEMBER_RANK <= {DAILY_TOP_K}, MEMBER, 'Other') as MEMBER,
+        SUM(QUERY_COUNT) as QUERY_COUNT,
+        SUM(EXEC_HOURS) as EXEC_HOURS,
+        SUM(CREDITS) as CREDITS
+    FROM ranked
+    GROUP BY 1, 2, 3
+    """
+    return run_query(_session, query)
+
+@daily_dataset(ttl=3600)
+def get_daily_metered_credits(_session, start, end):
+    query = f"""
+    SELECT
+        {utc_day('START_TIME')} as USAGE_DATE,
+        SUM(CREDITS_USED_COMPUTE) as CREDITS
+    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
+    WHERE {utc_window('START_TIME', start, end)}
+    GROUP BY 1
+    """
+    return run_query(_session, query)
+
+def top_members(partials, dimension, k):
+    """Merge a dimension's daily partials and fold everything past the top k into Other."""
+    rows = partials[partials['DIMENSION'] == dimension]
+    totals = rows.groupby('MEMBER', as_index=False)[['QUERY_COUNT', 'EXEC_HOURS', 'CREDITS']].sum()
+    ranked = totals[totals['MEMBER'] != 'Other'].sort_values('CREDITS', ascending=False)
+    keep = set(ranked['MEMBER'].head(k))
+    labels = rows['MEMBER'].where(rows['MEMBER'].isin(keep), 'Other')
+    daily = rows.assign(MEMBER=labels).groupby(['USAGE_DATE', 'MEMBER'], as_index=False)[['QUERY_COUNT', 'EXEC_HOURS', 'CREDITS']].sum()
+    totals = daily.groupby('MEMBER', as_index=False)[['QUERY_COUNT', 'EXEC_HOURS', 'CREDITS']].sum()
+    totals['SHARE_PCT'] = totals['CREDITS'] / totals['CREDITS'].sum() * 100 if totals['CREDITS'].sum() > 0 else 0
+    totals = totals.assign(IS_OTHER=totals['MEMBER'] == 'Other').sort_values(['IS_OTHER', 'CREDITS'], ascending=[True, False], ignore_index=True)
+    return totals.drop(columns='IS_OTHER'), daily
+
+loader = ProgressiveLoader("Cost Attribution")
+loader.fetch('attribution', get_daily_attribution, session, start_date, end_date)
+loader.fetch('metered', get_daily_metered_credits, session, start_date, end_date)
+
+def draw_kpis(attribution, metered):
+    warehouses = attribution[attribution['DIMENSION'] == 'WAREHOUSE'] if not attribution.empty else attribution
+    attributed = warehouses['CREDITS'].sum() if not warehouses.empty else 0
+    metered_total = metered['CREDITS'].sum() if not metered.empty else 0
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Attributed Credits", f"{attributed:,.1f}", help="Execution time × hourly credit rate of the warehouse size")
+    with col2:
+        st.metric("Metered Compute Credits", f"{metered_total:,.1f}")
+    with col3:
+        st.metric("Unattributed", f"{max(metered_total - attributed, 0) / metered_total * 100:.1f}%" if metered_total > 0 else "n/a", help="Idle running time, auto-suspend tails and concurrency overlap that no single query accounts for")
+    with col4:
+        st.metric("Queries", f"{warehouses['QUERY_COUNT'].sum():,}" if not warehouses.empty else "0")
+
+def draw_dimension(dimension):
+    def draw(attribution):
+        if attribution.empty:
+            st.info("No query data for this period")
+            return
+        totals, daily = top_members(attribution, dimension, top_k)
+        order = totals['MEMBER'].tolist()
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            chart = alt.Chart(totals).mark_bar().encode(
+                x=alt.X('CREDITS:Q', title='Credits'),
+                y=alt.Y('MEMBER:N', title='', sort=order),
+                color=alt.condition(alt.datum.MEMBER == 'Other', alt.value('#B0BEC5'), alt.value('#29B5E8')),
+                tooltip=['MEMBER:N', alt.Tooltip('CREDITS:Q', format=',.2f'), alt.Tooltip('SHARE_PCT:Q', format='.1f'), 'QUERY_COUNT:Q']
+            ).properties(height=max(200, 25 * len(totals)))
+            st.altair_chart(chart, use_container_width=True)
+        with col2:
+            chart = alt.Chart(daily).mark_area(opacity=0.8).encode(
+                x=alt.X('USAGE_DATE:T', title='Date', axis=alt.Axis(format='%b %d')),
+                y=alt.Y('CREDITS:Q', title='Credits', stack='zero'),
+                color=alt.Color('MEMBER:N', title=DIMENSIONS[dimension], sort=order),
+                order=alt.Order('CREDITS:Q', sort='descending')
+            ).properties(height=max(200, 25 * len(totals)))
+            st.altair_chart(chart, use_container_width=True)
+        display_df = totals[['MEMBER', 'CREDITS', 'SHARE_PCT', 'QUERY_COUNT', 'EXEC_HOURS']].copy()
+        display_df.columns = [DIMENSIONS[dimension], 'Credits', 'Share %', 'Queries', 'Execution Hours']
+        st.dataframe(display_df, use_container_width=True)
+    return draw
+
+loader.section("Attribution KPIs", st.empty(), ['attribution', 'metered'], draw_kpis)
+
+st.markdown("---")
+
+st.caption(f"Top {top_k} per dimension, with everything else grouped as Other. Credits are estimated from execution time and warehouse size, so idle and overlapping warehouse time is not attributed.")
+tabs = st.tabs([f"By {label}" for label in DIMENSIONS.values()])
+for tab, dimension in zip(tabs, DIMENSIONS):
+    with tab:
+        loader.section(f"By {DIMENSIONS[dimension]}", st.empty(), ['attribution'], draw_dimension(dimension), height=300)
+
+loader.run()
+show_timings("Cost Attribution")
@@ -1,10 +1,12 @@
 import streamlit as st
+from common.execution import begin_run
 
 st.set_page_config(
     page_title="Snowflake Usage Insights",
     layout="wide",
     initial_sidebar_state="expanded"
 )
+begin_run()
 
 st.title("Snowflake Usage Insights")
 st.markdown("Navigate using the sidebar to explore your Snowflake consumption data.")
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from common import accounts
+from common.accounts import SessionPool, fan_out
+from common.cache import CACHE, dataset, scope_of
+from common.execution import run_query
+
+CREDITS = {'a': [1.0, 2.0], 'b': [5.0]}
+
+
+class FakeJob:
+    def __init__(self, frame):
+        self.query_id = f"q{id(self)}"
+        self.frame = frame
+
+    def is_done(self):
+        return True
+
+    def result(self):
+        return self.frame.copy()
+
+
+class FakeSession:
+    """Answers every query with the canned credits of one account."""
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = []
+
+    def sql(self, query):
+        self.queries.append(query)
+        return self
+
+    def to_pandas(self, block=True, statement_params=None):
+        return FakeJob(pd.DataFrame({'CREDITS': CREDITS[self.name]}))
+
+
+@dataset()
+def get_credits(_session, day):
+    return run_query(_session, f"SELECT CREDITS FROM METERING WHERE DAY = '{day}'")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    connected = []
+
+    def connect(name):
+        connected.append(name)
+        return FakeSession(name)
+    pool = SessionPool(['a', 'b'], connect=connect)
+    pool.connected = connected
+    monkeypatch.setattr(accounts, "POOL", pool)
+    get_credits.clear()
+    yield pool
+    get_credits.clear()
+
+
+def test_fan_out_tags_and_merges_accounts(pool):
+    result = fan_out(get_credits, ['a', 'b'], '2026-10-05')
+    assert result.columns.tolist() == ['ACCOUNT_NAME', 'CREDITS']
+    assert result['ACCOUNT_NAME'].tolist() == ['a', 'a', 'b']
+    assert result['CREDITS'].tolist() == [1.0, 2.0, 5.0]
+    assert sorted(pool.connected) == ['a', 'b']
+
+
+def test_accounts_are_cached_separately(pool):
+    fan_out(get_credits, ['a', 'b'], '2026-10-05')
+    fan_out(get_credits, ['a', 'b'], '2026-10-05')
+    assert [len(pool.get(name).queries) for name in ['a', 'b']] == [1, 1]
+    assert scope_of(pool.get('a')) != scope_of(pool.get('b'))
+    keys = CACHE.entries().query("DATASET == @get_credits.dataset_name")['KEY']
+    assert sorted(keys) == ["account='a', day='2026-10-05'", "account='b', day='2026-10-05'"]
+    assert get_credits(pool.get('b'), '2026-10-05')['CREDITS'].tolist() == [5.0]
+
+
+def test_unconfigured_account_is_refused(pool):
+    with pytest.raises(KeyError):
+        pool.get('c')
+    assert pool.connected == []
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from common.cache import MISSING, DatasetCache
+from common.execution import QuerySuperseded
+
+KEY = ('ds', (('day', '2026-10-05'),))
+
+
+def wait_for_waiters(cache, count):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        with cache._lock:
+            flight = cache._inflight.get(KEY)
+            if flight is not None and flight.waiters >= count:
+                return
+        time.sleep(0.001)
+    raise AssertionError(f"{count} waiters never joined")
+
+
+def in_threads(count, target):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except BaseException as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def join(threads):
+    for thread in threads:
+        thread.join(5)
+
+
+def test_concurrent_misses_compute_once():
+    cache, calls, release = DatasetCache(), [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+    threads, results = in_threads(5, lambda: cache.get_or_compute('ds', KEY, compute))
+    wait_for_waiters(cache, 4)
+    release.set()
+    join(threads)
+    assert calls == [1]
+    assert results == ['value'] * 5
+    assert cache.coalesced() == 4
+    assert cache.get('ds', KEY) == 'value'
+
+
+def test_waiter_takes_over_when_the_leader_is_superseded():
+    cache, started, release = DatasetCache(), threading.Event(), threading.Event()
+
+    def superseded():
+        started.set()
+        release.wait(5)
+        raise QuerySuperseded()
+    leader, leader_result = in_threads(1, lambda: cache.get_or_compute('ds', KEY, superseded))
+    started.wait(5)
+    waiter, waiter_result = in_threads(1, lambda: cache.get_or_compute('ds', KEY, lambda: 'value'))
+    wait_for_waiters(cache, 1)
+    release.set()
+    join(leader + waiter)
+    assert isinstance(leader_result[0], QuerySuperseded)
+    assert waiter_result == ['value']
+    assert cache.get('ds', KEY) == 'value'
+
+
+def test_failure_is_shared_and_not_left_in_flight():
+    cache, calls, started, release = DatasetCache(), [], threading.Event(), threading.Event()
+
+    def failing():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+    leader, leader_result = in_threads(1, lambda: cache.get_or_compute('ds', KEY, failing))
+    started.wait(5)
+    waiter, waiter_result = in_threads(1, lambda: cache.get_or_compute('ds', KEY, failing))
+    wait_for_waiters(cache, 1)
+    release.set()
+    join(leader + waiter)
+    assert calls == [1]
+    assert all(isinstance(r, ValueError) for r in leader_result + waiter_result)
+    assert cache._inflight == {}
+    assert cache.get_or_compute('ds', KEY, lambda: 'value') == 'value'
+
+
+def test_unstored_results_are_recomputed():
+    cache, calls = DatasetCache(), []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+    assert cache.get_or_compute('ds', KEY, compute, store=False) == 'value'
+    assert cache.get_or_compute('ds', KEY, compute, store=False) == 'value'
+    assert calls == [1, 1]
+    assert not cache._entries
+
+
+@pytest.mark.parametrize("policy, evicted", [("lru", 'a'), ("lfu", 'b')])
+def test_eviction_keeps_resident_bytes_under_budget(policy, evicted):
+    value = b'x' * 1000
+    cache = DatasetCache(budget_bytes=2 * len(value) + 200, policy=policy)
+    cache.put('ds', 'a', value)
+    cache.put('ds', 'b', value)
+    cache.get('ds', 'a')
+    cache.get('ds', 'a')
+    cache.get('ds', 'b')
+    cache.put('ds', 'c', value)
+    assert cache.get('ds', evicted) is MISSING
+    assert len(cache._entries) == 2
+    assert cache.resident_bytes <= cache.budget_bytes
+    assert cache._stats['ds']['evictions'] == 1
+
+
+def test_values_over_budget_are_rejected():
+    cache = DatasetCache(budget_bytes=100)
+    cache.put('ds', 'a', b'x' * 1000)
+    assert cache.get('ds', 'a') is MISSING
+    assert cache.resident_bytes == 0
+    assert cache._stats['ds']['rejected'] == 1
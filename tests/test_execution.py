@@ -0,0 +1,107 @@
+import gc
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from common import execution
+
+
+SESSION_STATES = {}
+
+
+class FakeCtx:
+    """A script run context; every rerun of a session shares its state."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.session_state = SESSION_STATES.setdefault(session_id, {})
+
+
+class FakeJob:
+    def __init__(self, done=True):
+        self.query_id = f"q{id(self)}"
+        self.done = done
+        self.cancelled = False
+
+    def is_done(self):
+        return self.done
+
+    def result(self):
+        return pd.DataFrame({'N': [1]})
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeSession:
+    def sql(self, query):
+        return self
+
+    def to_pandas(self, block=True, statement_params=None):
+        return FakeJob()
+
+
+@pytest.fixture
+def ctx(monkeypatch):
+    current = {}
+    SESSION_STATES.clear()
+    monkeypatch.setattr(execution, "_runs", type(execution._runs)())
+    monkeypatch.setattr(execution, "get_script_run_ctx", lambda: current.get('ctx'))
+
+    def use(new_ctx):
+        current['ctx'] = new_ctx
+        return new_ctx
+    return use
+
+
+def test_fragment_rerun_is_not_superseded(ctx):
+    ctx(FakeCtx("s1"))
+    execution.begin_run()
+    ctx(FakeCtx("s1"))
+    execution.begin_fragment()
+    assert execution.run_query(FakeSession(), "SELECT 1")['N'].tolist() == [1]
+
+
+def test_fragment_rerun_keeps_page_jobs(ctx):
+    ctx(FakeCtx("s1"))
+    execution.begin_run()
+    pending = FakeJob(done=False)
+    execution._runs["s1"].jobs.append((pending, None))
+    ctx(FakeCtx("s1"))
+    execution.begin_fragment()
+    assert not pending.cancelled
+    assert execution.cancelled_count() == 0
+
+
+def test_stale_context_is_superseded(ctx):
+    stale = ctx(FakeCtx("s1"))
+    execution.begin_run()
+    ctx(FakeCtx("s1"))
+    execution.begin_run()
+    ctx(stale)
+    with pytest.raises(execution.QuerySuperseded):
+        execution.run_query(FakeSession(), "SELECT 1")
+
+
+def test_full_rerun_cancels_previous_jobs(ctx):
+    ctx(FakeCtx("s1"))
+    execution.begin_run()
+    pending = FakeJob(done=False)
+    execution._runs["s1"].jobs.append((pending, None))
+    ctx(FakeCtx("s1"))
+    execution.begin_run()
+    assert pending.cancelled
+    assert execution.cancelled_count() == 1
+
+
+def test_run_is_released_with_its_session(ctx):
+    ctx(FakeCtx("s1"))
+    execution.begin_run()
+    ctx(FakeCtx("s2"))
+    execution.begin_run()
+    ctx(None)
+    del SESSION_STATES["s1"]
+    gc.collect()
+    assert list(execution._runs) == ["s2"]
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from common.export import ExportTooLarge, stream_export
+
+
+class FakeSession:
+    def __init__(self, batches, schema=None):
+        self.batches = batches
+        self.schema = schema
+
+    def sql(self, query):
+        return self
+
+    def to_pandas_batches(self):
+        return iter(self.batches)
+
+
+def read_parquet(batches, fields):
+    pq = pytest.importorskip("pyarrow.parquet")
+    types = pytest.importorskip("snowflake.snowpark.types")
+    schema = types.StructType([types.StructField(name, datatype(types)) for name, datatype in fields.items()])
+    return pq.read_table(stream_export(FakeSession(batches, schema), "SELECT 1", "Parquet"))
+
+
+def test_parquet_with_all_null_first_batch():
+    table = read_parquet([
+        pd.DataFrame({'QUERY_ID': ['a', 'b'], 'QUERY_TAG': [None, None], 'CREDITS': [None, None], 'END_TIME': [None, None]}),
+        pd.DataFrame({'QUERY_ID': ['c'], 'QUERY_TAG': ['nightly'], 'CREDITS': [1.5], 'END_TIME': [pd.Timestamp('2026-10-05 12:00')]}),
+    ], {
+        'QUERY_ID': lambda t: t.StringType(),
+        'QUERY_TAG': lambda t: t.StringType(),
+        'CREDITS': lambda t: t.DecimalType(38, 9),
+        'END_TIME': lambda t: t.TimestampType(t.TimestampTimeZone.NTZ),
+    })
+    assert str(table.schema.field('CREDITS').type) == 'double'
+    assert str(table.schema.field('END_TIME').type) == 'timestamp[ns]'
+    assert table.column('QUERY_TAG').to_pylist() == [None, None, 'nightly']
+    assert table.column('CREDITS').to_pylist() == [None, None, 1.5]
+
+
+def test_parquet_with_integral_first_batch_of_a_float_column():
+    table = read_parquet([
+        pd.DataFrame({'N': [1, 2], 'CREDITS': [1, 2]}),
+        pd.DataFrame({'N': [3], 'CREDITS': [2.5]}),
+    ], {
+        'N': lambda t: t.DecimalType(38, 0),
+        'CREDITS': lambda t: t.DoubleType(),
+    })
+    assert str(table.schema.field('N').type) == 'int64'
+    assert table.column('CREDITS').to_pylist() == [1.0, 2.0, 2.5]
+
+
+def test_csv_writes_header_once():
+    session = FakeSession([pd.DataFrame({'N': [1, 2]}), pd.DataFrame({'N': [3]})])
+    out = stream_export(session, "SELECT 1", "CSV (gzip)")
+    assert pd.read_csv(out, compression='gzip')['N'].tolist() == [1, 2, 3]
+
+
+def test_export_stops_past_max_bytes():
+    session = FakeSession([pd.DataFrame({'N': range(10000)}) for _ in range(10)])
+    with pytest.raises(ExportTooLarge):
+        stream_export(session, "SELECT 1", "CSV (gzip)", max_bytes=1024)
@@ -0,0 +1,54 @@
+import json
+from datetime import date
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from common.grain import GRAINS, choose_grain, plan_grain
+
+
+class FakeJob:
+    def __init__(self, plan):
+        self.query_id = f"q{id(self)}"
+        self.plan = plan
+
+    def is_done(self):
+        return True
+
+    def result(self):
+        return pd.DataFrame({'content': [json.dumps(self.plan)]})
+
+
+class FakeSession:
+    def __init__(self, bytes_assigned):
+        self.bytes_assigned = bytes_assigned
+        self.queries = []
+
+    def sql(self, query):
+        self.queries.append(query)
+        return self
+
+    def to_pandas(self, block=True, statement_params=None):
+        return FakeJob({"GlobalStats": {"partitionsTotal": 10, "partitionsAssigned": 4, "bytesAssigned": self.bytes_assigned}})
+
+
+@pytest.mark.parametrize("days, series, grain", [(7, 1, "HOUR"), (90, 4, "DAY"), (365, 1, "DAY"), (365, 20, "WEEK")])
+def test_grain_follows_window_length(days, series, grain):
+    start = date(2026, 1, 1)
+    assert choose_grain(start, start + pd.Timedelta(days=days), series, row_budget=5000) == grain
+
+
+def test_within_budget_keeps_the_chosen_grain():
+    session = FakeSession(1024)
+    grain, estimate = plan_grain(session, "SELECT 1", date(2026, 10, 1), date(2026, 10, 8), scan_budget=2048)
+    assert grain == "HOUR"
+    assert not estimate["over_budget"]
+    assert session.queries == ["EXPLAIN USING JSON SELECT 1"]
+
+
+def test_over_budget_is_flagged_at_the_coarsest_grain():
+    grain, estimate = plan_grain(FakeSession(4096), "SELECT 1", date(2026, 10, 1), date(2026, 10, 8), scan_budget=2048)
+    assert grain == GRAINS[-1]
+    assert estimate == {"partitions_total": 10, "partitions_assigned": 4, "bytes_assigned": 4096, "over_budget": True}
@@ -0,0 +1,65 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from common import incremental
+from common.cache import CACHE
+from common.incremental import daily_dataset, utc_day, utc_window
+
+TTL = 60
+SETTLED_TTL = 3600
+
+
+@daily_dataset(ttl=TTL, settled_ttl=SETTLED_TTL)
+def get_daily(_session, start, end):
+    days = pd.date_range(start, end, freq='D', inclusive='left')
+    return pd.DataFrame({'USAGE_DATE': days, 'N': range(len(days))})
+
+
+def ttls():
+    return {
+        key[1][0][1]: round(entry.expires_at - entry.created_at)
+        for key, entry in CACHE._entries.items() if entry.dataset == get_daily.dataset_name
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear():
+    get_daily.clear()
+    yield
+    get_daily.clear()
+
+
+@pytest.mark.parametrize("cutoff, settled", [
+    ("2026-10-05 00:00", {"2026-10-03", "2026-10-04"}),
+    ("2026-10-04 23:00", {"2026-10-03"}),
+])
+def test_day_settles_when_its_utc_end_passes_the_cutoff(monkeypatch, cutoff, settled):
+    monkeypatch.setattr(incremental, "account_usage_cutoff", lambda: pd.Timestamp(cutoff))
+    assert len(get_daily(None, date(2026, 10, 3), date(2026, 10, 6))) == 3
+    assert ttls() == {day: SETTLED_TTL if day in settled else TTL for day in ["2026-10-03", "2026-10-04", "2026-10-05"]}
+
+
+def test_only_missing_days_are_fetched(monkeypatch):
+    calls = []
+    monkeypatch.setattr(incremental, "account_usage_cutoff", lambda: pd.Timestamp("2026-10-10"))
+
+    @daily_dataset()
+    def get_counted(_session, start, end):
+        calls.append((start, end))
+        return get_daily.__wrapped__(_session, start, end)
+
+    get_counted(None, date(2026, 10, 3), date(2026, 10, 5))
+    result = get_counted(None, date(2026, 10, 3), date(2026, 10, 7))
+    get_counted.clear()
+    assert calls == [(date(2026, 10, 3), date(2026, 10, 5)), (date(2026, 10, 5), date(2026, 10, 7))]
+    assert pd.to_datetime(result['USAGE_DATE']).dt.day.tolist() == [3, 4, 5, 6]
+
+
+def test_utc_window_bounds_are_utc_midnights():
+    midnight = int(pd.Timestamp("2026-10-05", tz="UTC").timestamp())
+    assert utc_window("START_TIME", date(2026, 10, 5), date(2026, 10, 6)) == (
+        f"START_TIME >= TO_TIMESTAMP_LTZ({midnight}) AND START_TIME < TO_TIMESTAMP_LTZ({midnight + 86400})"
+    )
+    assert utc_day("START_TIME") == "CONVERT_TIMEZONE('UTC', START_TIME)::DATE"
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from common import live
+from common.live import QUERY_RESULT_LIMIT, LiveTail
+
+CUTOFF = pd.Timestamp("2026-10-05 09:00")
+
+
+def poll(monkeypatch, tail, query_count):
+    queries = pd.DataFrame({
+        'QUERY_ID': [f"q{i}" for i in range(query_count)],
+        'START_TIME': [CUTOFF + pd.Timedelta(minutes=1)] * query_count,
+    })
+    monkeypatch.setattr(live, "fetch_query_tail", lambda session, since: queries)
+    monkeypatch.setattr(live, "fetch_metering_tail", lambda session, since: pd.DataFrame())
+    monkeypatch.setattr(live, "fetch_load_tail", lambda session, since: pd.DataFrame())
+    tail.poll(None)
+
+
+def test_poll_flags_a_result_at_the_limit(monkeypatch):
+    tail = LiveTail(CUTOFF)
+    poll(monkeypatch, tail, 10)
+    assert tail.truncated_until is None
+    poll(monkeypatch, tail, QUERY_RESULT_LIMIT)
+    assert tail.truncated_until == tail.watermark
+    assert len(tail.queries) == QUERY_RESULT_LIMIT
+
+
+def test_advance_trims_covered_rows_and_clears_truncation(monkeypatch):
+    tail = LiveTail(CUTOFF)
+    poll(monkeypatch, tail, QUERY_RESULT_LIMIT)
+    tail.advance(CUTOFF + pd.Timedelta(hours=1))
+    assert tail.queries.empty
+    assert tail.truncated_until is not None
+    tail.advance(tail.truncated_until.ceil('h'))
+    assert tail.truncated_until is None
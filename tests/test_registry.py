@@ -0,0 +1,90 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from common import registry
+from common.registry import _grouping_id, load, plan, register
+
+METERING = 'WAREHOUSE_METERING_HISTORY'
+
+
+def scan(view, rows):
+    """A daily GROUPING SETS scan of `view`; columns left out of a row are rolled up."""
+    columns, _, measures = plan(view)
+    partials = [p for m, (agg, _) in measures.items() for p in ([f"{m}__SUM", f"{m}__COUNT"] if agg == 'avg' else [m])]
+    frame = pd.DataFrame(rows, columns=['USAGE_DATE', *columns, *partials])
+    frame['GROUPING_SET'] = [_grouping_id(columns, [c for c in columns if pd.notna(row.get(c))]) for row in rows]
+    return frame
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    frames, calls = {}, []
+    monkeypatch.setattr(registry, "REGISTRY", dict(registry.REGISTRY))
+
+    def get_view_scan(session, start, end, view):
+        calls.append((start, end, view))
+        return frames[view]
+    monkeypatch.setattr(registry, "get_view_scan", get_view_scan)
+    frames['calls'] = calls
+    return frames
+
+
+def test_grouping_id_sets_a_bit_per_rolled_up_column():
+    assert _grouping_id(['A', 'B', 'C'], ('A', 'C')) == 0b010
+    assert _grouping_id(['A', 'B', 'C'], ()) == 0b111
+    assert _grouping_id(['A', 'B', 'C'], ('A', 'B', 'C')) == 0
+
+
+def test_each_dataset_reads_its_own_grouping_set(scans):
+    register('total_credits', METERING, {'CREDITS': ('sum', 'CREDITS_USED')})
+    scans[METERING] = scan(METERING, [
+        {'USAGE_DATE': date(2026, 10, 5), 'WAREHOUSE_NAME': 'ETL', 'CREDITS': 3.0, 'CLOUD_SERVICES_CREDITS': 0.1, 'ACTIVE_HOURS': 2},
+        {'USAGE_DATE': date(2026, 10, 5), 'WAREHOUSE_NAME': 'BI', 'CREDITS': 1.0, 'CLOUD_SERVICES_CREDITS': 0.1, 'ACTIVE_HOURS': 1},
+        {'USAGE_DATE': date(2026, 10, 5), 'CREDITS': 4.0, 'CLOUD_SERVICES_CREDITS': 0.2, 'ACTIVE_HOURS': 3},
+    ])
+    assert load(None, 'total_credits', date(2026, 10, 5), date(2026, 10, 6))['CREDITS'].tolist() == [4.0]
+    usage = load(None, 'warehouse_usage', date(2026, 10, 5), date(2026, 10, 6))
+    assert usage.to_dict('records') == [
+        {'WAREHOUSE_NAME': 'ETL', 'CREDITS': 3.0, 'ACTIVE_HOURS': 2},
+        {'WAREHOUSE_NAME': 'BI', 'CREDITS': 1.0, 'ACTIVE_HOURS': 1},
+    ]
+
+
+def test_averages_are_recombined_from_daily_partials(scans, monkeypatch):
+    monkeypatch.setattr(registry, "account_usage_cutoff", lambda: pd.Timestamp("2026-10-05 09:00"))
+    scans['STORAGE_USAGE'] = scan('STORAGE_USAGE', [
+        {'USAGE_DATE': date(2026, 10, 1), 'TOTAL_TB__SUM': 10.0, 'TOTAL_TB__COUNT': 1},
+        {'USAGE_DATE': date(2026, 10, 2), 'TOTAL_TB__SUM': 30.0, 'TOTAL_TB__COUNT': 3},
+    ])
+    assert load(None, 'storage_summary')['TOTAL_TB'].tolist() == [10.0]
+    assert scans['calls'] == [(date(2026, 9, 28), date(2026, 10, 5), 'STORAGE_USAGE')]
+
+
+def test_weeks_run_monday_to_sunday(scans):
+    scans[METERING] = scan(METERING, [
+        {'USAGE_DATE': day, 'WAREHOUSE_NAME': 'ETL', 'CREDITS': credits, 'CLOUD_SERVICES_CREDITS': 0.0}
+        for day, credits in [(date(2026, 10, 4), 1.0), (date(2026, 10, 5), 2.0), (date(2026, 10, 11), 4.0)]
+    ])
+    weekly = load(None, 'weekly_credits', date(2026, 10, 4), date(2026, 10, 12), {'WAREHOUSE_NAME': ['ETL']})
+    assert weekly['USAGE_DATE'].tolist() == [pd.Timestamp('2026-09-28'), pd.Timestamp('2026-10-05')]
+    assert weekly['CREDITS'].tolist() == [1.0, 6.0]
+
+
+def test_limit_keeps_the_top_rows_by_order(scans):
+    scans[METERING] = scan(METERING, [
+        {'USAGE_DATE': date(2026, 10, 5), 'WAREHOUSE_NAME': f"WH{i:02}", 'CREDITS': float(i)}
+        for i in range(12)
+    ])
+    top = load(None, 'warehouse_credits', date(2026, 10, 5), date(2026, 10, 6))
+    assert top['WAREHOUSE_NAME'].tolist() == [f"WH{i:02}" for i in range(11, 1, -1)]
+
+
+def test_filters_are_restricted_to_declared_columns(scans):
+    scans[METERING] = scan(METERING, [{'USAGE_DATE': date(2026, 10, 5), 'WAREHOUSE_NAME': 'ETL', 'CREDITS': 1.0}])
+    assert load(None, 'daily_credits', date(2026, 10, 5), date(2026, 10, 6), {'WAREHOUSE_NAME': ['BI']}).empty
+    with pytest.raises(ValueError):
+        load(None, 'warehouse_credits', date(2026, 10, 5), date(2026, 10, 6), {'WAREHOUSE_NAME': ['ETL']})